@@ -0,0 +1,310 @@
+"""Микробенчмарки горячих путей homework.py.
+
+Запуск из корня репозитория:
+
+    python benchmarks/bench_homework.py --output bench.json
+    python benchmarks/bench_homework.py --compare bench.json
+
+Результаты пишутся в JSON, по одному объекту на замер, поэтому их
+можно сравнивать между коммитами.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import homework  # noqa: E402
+import storage  # noqa: E402
+import transport  # noqa: E402
+from engine import Engine  # noqa: E402
+from tenants import Tenant  # noqa: E402
+
+PAYLOAD_SIZES = (0, 10, 1000)
+TENANT_COUNTS = (1, 100, 1000)
+REGRESSION_THRESHOLD = 1.2
+
+
+def make_payload(size):
+    """Собирает ответ API с size домашними работами."""
+    statuses = tuple(homework.HOMEWORK_VERDICTS)
+    return {
+        'homeworks': [
+            {
+                'id': number,
+                'homework_name': f'username__hw{number}.zip',
+                'reviewer_comment': 'Всё нравится',
+                'status': statuses[number % len(statuses)],
+                'date_updated': '2022-02-13T14:40:57Z',
+                'lesson_name': 'Итоговый проект',
+            }
+            for number in range(size)
+        ],
+        'current_date': 1000198991,
+    }
+
+
+class StubBot:
+    """Заглушка бота в духе MockTelegramBot из тестов."""
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.chat_id = chat_id
+        self.text = text
+
+
+class PracticumStandIn:
+    """Локальный HTTP-сервер, отдающий заранее собранный ответ API."""
+
+    def __init__(self):
+        self.body = b'{}'
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Заголовки и тело уходят одним пакетом, иначе keep-alive
+            # упирается в задержку ACK.
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(stand_in.body)))
+                self.end_headers()
+                self.wfile.write(stand_in.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = (
+            f'http://127.0.0.1:{self.server.server_port}'
+            '/api/user_api/homework_statuses/'
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def serve(self, payload):
+        self.body = json.dumps(payload).encode('utf-8')
+
+    def close(self):
+        self.server.shutdown()
+
+
+def measure(name, func, repeat, **params):
+    """Вызывает func repeat раз и возвращает статистику в секундах."""
+    func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    result = {
+        'name': name,
+        'params': params,
+        'repeat': repeat,
+        'mean': statistics.fmean(timings),
+        'median': statistics.median(timings),
+        'min': timings[0],
+        'p95': timings[int(len(timings) * 0.95) - 1 if repeat > 1 else 0],
+    }
+    print(f"{name:<22} {json.dumps(params):<28} "
+          f"median {result['median'] * 1e6:12.1f} мкс", file=sys.stderr)
+    return result
+
+
+def bench_api(stand_in, repeat):
+    results = []
+    session = transport.create_session(pool_size=1)
+    for size in PAYLOAD_SIZES:
+        stand_in.serve(make_payload(size))
+        results.append(measure(
+            'get_api_answer', lambda: homework.get_api_answer(0),
+            repeat, homeworks=size
+        ))
+        results.append(measure(
+            'request_statuses_pool',
+            lambda: homework.request_statuses(0, homework.HEADERS, session),
+            repeat, homeworks=size
+        ))
+    session.close()
+    return results
+
+
+def bench_parsing(repeat):
+    results = []
+    for size in PAYLOAD_SIZES:
+        payload = make_payload(size)
+        results.append(measure(
+            'check_response', lambda: homework.check_response(payload),
+            repeat, homeworks=size
+        ))
+
+        records = homework.check_response(payload).records
+
+        def parse_all():
+            for home_work in records:
+                homework.parse_status(home_work)
+
+        results.append(measure(
+            'parse_status', parse_all, repeat, homeworks=size
+        ))
+    return results
+
+
+def bench_send(repeat):
+    bot = StubBot()
+    return [measure(
+        'send_message',
+        lambda: homework.send_message(bot, 'Test_message_check'),
+        repeat
+    )]
+
+
+def bench_main(stand_in, repeat):
+    """Одна итерация main(): цикл прерывается на time.sleep."""
+    class BreakLoop(Exception):
+        pass
+
+    def interrupt(delay):
+        raise BreakLoop
+
+    telegram = sys.modules['telegram']
+    original_bot, original_sleep = telegram.Bot, time.sleep
+    telegram.Bot = lambda token=None: StubBot()
+    time.sleep = interrupt
+
+    def iteration():
+        try:
+            homework.main()
+        except BreakLoop:
+            pass
+
+    results = []
+    try:
+        for size in PAYLOAD_SIZES:
+            stand_in.serve(make_payload(size))
+            results.append(measure(
+                'main_iteration', iteration, repeat, homeworks=size
+            ))
+    finally:
+        telegram.Bot, time.sleep = original_bot, original_sleep
+    return results
+
+
+def bench_engine(stand_in, repeat):
+    """Один проход опроса по всем студентам через пул Engine."""
+    stand_in.serve(make_payload(0))
+    transport.configure(pool_size=32)
+    results = []
+    try:
+        for count in TENANT_COUNTS:
+            tenants = [
+                Tenant(f'token{number}', number) for number in range(count)
+            ]
+            engine = Engine(StubBot(), [], store=storage.StateStore(':memory:'))
+            executor = ThreadPoolExecutor(max_workers=32)
+
+            def poll_all():
+                for _ in executor.map(engine.poll, tenants):
+                    pass
+
+            results.append(measure(
+                'engine_poll_all', poll_all, max(1, repeat // count),
+                tenants=count
+            ))
+            executor.shutdown()
+    finally:
+        transport.configure(pool_size=0)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Печатает отношение медиан к базовому прогону.
+
+    Возвращает True, если какой-то замер медленнее порога.
+    """
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = {
+            (item['name'], json.dumps(item['params'], sort_keys=True)):
+            item for item in json.load(file)['results']
+        }
+    regressed = False
+    for item in results:
+        key = (item['name'], json.dumps(item['params'], sort_keys=True))
+        if key not in baseline:
+            continue
+        ratio = item['median'] / baseline[key]['median']
+        mark = ''
+        if ratio > REGRESSION_THRESHOLD:
+            mark = '  <-- регрессия'
+            regressed = True
+        print(f"{key[0]:<22} {key[1]:<28} x{ratio:5.2f}{mark}",
+              file=sys.stderr)
+    return regressed
+
+
+def main():
+    """Запускает все замеры."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--compare', help='JSON прошлого прогона')
+    args = parser.parse_args()
+    # Записи логов формируются как в бою, но никуда не выводятся.
+    logging.basicConfig(handlers=[logging.NullHandler()])
+
+    homework.PRACTICUM_TOKEN = 'sometoken'
+    homework.TELEGRAM_TOKEN = '1234:abcdefg'
+    homework.TELEGRAM_CHAT_ID = '12345'
+    stand_in = PracticumStandIn()
+    homework.ENDPOINT = stand_in.url
+    try:
+        results = (
+            bench_api(stand_in, args.repeat)
+            + bench_parsing(args.repeat)
+            + bench_send(args.repeat)
+            + bench_main(stand_in, args.repeat)
+            + bench_engine(stand_in, args.repeat)
+        )
+    finally:
+        stand_in.close()
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=1)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False)
+        print()
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
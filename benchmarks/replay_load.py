@@ -0,0 +1,66 @@
+"""Нагрузочный прогон main() на записанном трафике.
+
+Запись делается в боевом режиме:
+
+    RECORD_FILE=traffic.jsonl.gz python homework.py
+
+Воспроизведение через весь цикл main() без сети:
+
+    python benchmarks/replay_load.py traffic.jsonl.gz --speed 0
+
+При --speed 0 ответы отдаются без задержек и замеряется пропускная
+способность, при --speed 1 — с записанными интервалами.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def configure_env(tape, speed):
+    """Настраивает окружение до импорта модулей бота."""
+    os.environ['REPLAY_FILE'] = tape
+    os.environ['REPLAY_SPEED'] = str(speed)
+    os.environ.pop('RECORD_FILE', None)
+    os.environ.pop('STATE_DB', None)
+    for name, value in (('PRACTICUM_TOKEN', 'replay'),
+                        ('TELEGRAM_TOKEN', '123456:replay'),
+                        ('TELEGRAM_CHAT_ID', '1')):
+        os.environ.setdefault(name, value)
+
+
+def main():
+    """Воспроизводит запись и печатает итог в JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('tape', help='запись в JSONL или JSONL.gz')
+    parser.add_argument('--speed', type=float, default=0)
+    args = parser.parse_args()
+    configure_env(args.tape, args.speed)
+    logging.basicConfig(handlers=[logging.NullHandler()])
+
+    import homework
+    import replay
+
+    session = replay.install()
+    started = time.perf_counter()
+    try:
+        homework.main()
+    except replay.ReplayFinished:
+        pass
+    elapsed = time.perf_counter() - started
+    sent = session.bot.sent if session.bot is not None else 0
+    print(json.dumps({
+        'requests': session.requests,
+        'messages': sent,
+        'seconds': round(elapsed, 6),
+        'requests_per_second': round(session.requests / elapsed, 1),
+    }, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import logging
+import os
+import threading
+import time
+
+import metrics
+
+
+logger = logging.getLogger(__name__)
+
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 5))
+BREAKER_PROBE_INTERVAL = float(os.getenv('BREAKER_PROBE_INTERVAL', 60))
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = metrics.Gauge(
+    'homework_breaker_state',
+    'Состояние предохранителя: 0 закрыт, 1 пробный запрос, 2 открыт',
+    ('dependency',)
+)
+
+
+class CircuitBreaker:
+    """Предохранитель для обращений к внешнему сервису.
+
+    После threshold ошибок подряд размыкается и не пропускает вызовы
+    probe_interval секунд, затем пропускает один пробный вызов. Успех
+    пробы замыкает предохранитель, ошибка снова размыкает.
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD,
+                 probe_interval=BREAKER_PROBE_INTERVAL):
+        self.name = name
+        self.threshold = threshold
+        self.probe_interval = probe_interval
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = threading.Lock()
+        BREAKER_STATE.labels(name).set(STATE_VALUES[CLOSED])
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        logger.warning(
+            "Предохранитель %s: %s -> %s", self.name, self.state, state
+        )
+        self.state = state
+        BREAKER_STATE.labels(self.name).set(STATE_VALUES[state])
+
+    def allow(self):
+        """Можно ли сейчас обращаться к сервису."""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.retry_in() <= 0:
+                self._set_state(HALF_OPEN)
+                return True
+            return False
+
+    def retry_in(self):
+        """Сколько секунд осталось до пробного вызова."""
+        return self.opened_at + self.probe_interval - time.monotonic()
+
+    def success(self):
+        """Отмечает успешный вызов."""
+        with self.lock:
+            self.failures = 0
+            self._set_state(CLOSED)
+
+    def probe_failed(self):
+        """Размыкает предохранитель, если пробный вызов не удался.
+
+        Нужен для ошибок, не говорящих о доступности сервиса: проба
+        должна завершиться в любом случае, иначе вызовы не пройдут.
+        """
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def failure(self):
+        """Отмечает неудачный вызов."""
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(OPEN)
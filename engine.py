@@ -0,0 +1,424 @@
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import exceptions
+import homework
+import lifecycle
+import log_config
+import metrics
+import replay
+import sharding
+import storage
+import streaming
+import transport
+import validation
+from breaker import CLOSED, CircuitBreaker
+from outbox import Outbox, idempotency_key, notification_priority
+from scheduler import POLL_DEADLINE, Deadline, PollScheduler
+from statuses import StatusIndex
+from tenants import TenantRegistry
+
+
+logger = logging.getLogger(__name__)
+
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 32))
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '') == '1'
+OUTBOX_DRAIN_TIMEOUT = float(os.getenv('OUTBOX_DRAIN_TIMEOUT', 30))
+BACKFILL_AFTER = float(os.getenv('BACKFILL_AFTER', 3600))
+HEARTBEAT_FILE = os.getenv('HEARTBEAT_FILE')
+HEARTBEAT_INTERVAL = float(os.getenv('HEARTBEAT_INTERVAL', 5))
+
+
+def is_stale(tenant):
+    """Отстал ли студент больше чем на BACKFILL_AFTER секунд."""
+    return time.time() - tenant.timestamp > BACKFILL_AFTER
+
+
+def is_outage(error):
+    """Отличает недоступность API от ошибки конкретного студента.
+
+    Ответы 4xx (например, неверный токен) предохранитель не размыкают.
+    """
+    status_code = getattr(error, 'status_code', None)
+    return status_code is None or status_code >= 500
+
+
+class Engine:
+    """Опрашивает API Практикума сразу для многих студентов.
+
+    Студенты хранятся в куче по времени следующего опроса, сами опросы
+    выполняет ограниченный пул потоков.
+    """
+
+    def __init__(self, bot, tenants, workers=POLL_WORKERS, scheduler=None,
+                 store=None, outbox=None, shard=None, registry=None):
+        self.store = store or storage.open_store()
+        self.outbox = outbox or Outbox(bot, store=self.store)
+        self.api_breaker = CircuitBreaker('practicum')
+        self.shard = shard
+        self.registry = registry
+        self._reload = threading.Event()
+        self.scheduler = scheduler or PollScheduler.from_env(
+            homework.RETRY_PERIOD
+        )
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='poll'
+        )
+        self.queue = []
+        self.parked = []
+        self.condition = threading.Condition()
+        self.running = False
+        self._counter = itertools.count()
+        if shard is not None:
+            shard.on_release = self._release
+            shard.on_ring_change = self._unpark
+        self._last_beat = float('-inf')
+        now = time.monotonic()
+        stale = 0
+        for tenant in tenants:
+            self._restore(tenant)
+            if is_stale(tenant):
+                # Догоняем пропущенное сразу, параллельность ограничена
+                # размером пула.
+                stale += 1
+                self.schedule(tenant, now)
+                continue
+            # Разносим первые опросы по периоду, чтобы не было всплеска.
+            delay = random.uniform(0, self.scheduler.interval)
+            self.schedule(tenant, now + delay)
+        if stale:
+            logger.info("Догоняем пропущенное для студентов: %d", stale)
+
+    def _restore(self, tenant):
+        tenant.timestamp = (
+            self.store.load_checkpoint(tenant.key) or tenant.timestamp
+        )
+        tenant.index = StatusIndex(self.store.load_statuses(tenant.key))
+
+    def _claim(self, tenant):
+        """Закрепляет студента за воркером перед опросом.
+
+        Студента, перешедшего от другого воркера, перечитываем из базы:
+        его мог опрашивать прежний владелец.
+        """
+        if self.shard is None:
+            return True
+        adopted = not self.shard.holds(tenant.key)
+        if not self.shard.claim(tenant.key):
+            return False
+        if adopted:
+            self._restore(tenant)
+            self.outbox.restore(tenant.key)
+        return True
+
+    def _release(self, keys):
+        """Передаёт отпущенных студентов новому владельцу.
+
+        Неотправленные сообщения уходят из своей очереди: новый владелец
+        прочитает их из базы, и повторной отправки не будет.
+        """
+        self.outbox.release(keys)
+        self.store.flush()
+
+    def schedule(self, tenant, due):
+        """Ставит опрос студента в очередь на момент due."""
+        with self.condition:
+            heapq.heappush(self.queue, (due, next(self._counter), tenant))
+            self.condition.notify()
+
+    def fetch_changes(self, tenant, deadline=None):
+        """Запрашивает API и возвращает изменившиеся работы.
+
+        Возвращает (работы, current_date, ошибки по отброшенным записям);
+        для ответа, не изменившегося с прошлого опроса, ошибки — None.
+        При STREAM_RESPONSES ответ разбирается потоково и целиком
+        в памяти не хранится.
+        """
+        api_seconds = metrics.API_SECONDS.labels(tenant.key)
+        if STREAM_RESPONSES:
+            with api_seconds.time():
+                response = streaming.stream_statuses(
+                    tenant.timestamp, tenant.headers, deadline=deadline
+                )
+            try:
+                changed = tenant.index.changes(response.homeworks())
+            finally:
+                response.close()
+            return changed, response.current_date, response.errors
+        cache = tenant.response_cache
+        with api_seconds.time():
+            response = homework.fetch_response(
+                tenant.timestamp, tenant.headers, etag=cache.etag,
+                deadline=deadline
+            )
+        current_date = cache.unchanged_date(response)
+        if current_date is not None:
+            logger.debug("%s: ответ API не изменился", tenant)
+            return [], current_date, None
+        response = response.json()
+        result = homework.check_response(response)
+        changed = tenant.index.changes(result.records)
+        return changed, response.get('current_date'), result.errors
+
+    def poll(self, tenant):
+        """Выполняет один цикл опроса API для студента.
+
+        Пока предохранитель API разомкнут, опрос пропускается. Весь цикл
+        укладывается в POLL_DEADLINE секунд, отправка сообщений идёт
+        через outbox и цикл не задерживает.
+        """
+        if not self.api_breaker.allow():
+            logger.debug("%s: API недоступен, опрос пропущен", tenant)
+            return
+        try:
+            changed, current_date, errors = self.fetch_changes(
+                tenant, Deadline(POLL_DEADLINE)
+            )
+            recovered = self.api_breaker.state != CLOSED
+            self.api_breaker.success()
+            if recovered:
+                # API снова доступен: опрашиваем всех, не дожидаясь
+                # отложенных после ошибок сроков.
+                logger.info("API восстановился, догоняем пропущенное")
+                self.wake()
+            for home_work in changed:
+                message = homework.parse_status(home_work)
+                self.outbox.put(
+                    tenant.chat_id, message,
+                    key=idempotency_key(tenant.key, home_work),
+                    tenant=tenant.key,
+                    priority=notification_priority(home_work),
+                    group=f'{tenant.key}:{home_work.key}'
+                )
+                tenant.index.commit(home_work)
+            tenant.timestamp = current_date or tenant.timestamp
+            self.store.checkpoint(tenant.key, tenant.timestamp, changed)
+            tenant.response_cache.commit()
+            if errors is not None:
+                self._report_invalid(tenant, errors)
+        except Exception as error:
+            metrics.record_error(tenant.key, error)
+            if isinstance(error, exceptions.PracticumAPIError):
+                tenant.failures += 1
+                if is_outage(error):
+                    self.api_breaker.failure()
+                else:
+                    self.api_breaker.success()
+            else:
+                self.api_breaker.probe_failed()
+            errormessage = f'Сбой в работе программы: {error}'
+            logger.error("%s: %s", tenant, errormessage)
+            if tenant.last_error != errormessage:
+                tenant.last_error = errormessage
+                self.outbox.put(tenant.chat_id, errormessage)
+        else:
+            tenant.last_error = None
+            tenant.failures = 0
+
+    def _report_invalid(self, tenant, errors):
+        # Об отброшенных записях сообщаем один раз, пока они не исчезнут
+        # из ответа; неизменившийся ответ сюда не попадает.
+        errormessage = validation.describe(errors)
+        if errormessage and tenant.last_invalid != errormessage:
+            self.outbox.put(tenant.chat_id, errormessage)
+        tenant.last_invalid = errormessage
+
+    def add_tenant(self, tenant):
+        """Добавляет студента и сразу ставит его опрос в очередь."""
+        self._restore(tenant)
+        self.schedule(tenant, time.monotonic())
+
+    def remove_tenant(self, tenant):
+        """Убирает студента: начатый опрос и отправка доработают."""
+        tenant.active = False
+        if self.shard is not None:
+            self.shard.release(tenant.key)
+
+    def reload(self):
+        """Применяет изменения списка студентов."""
+        added, removed = self.registry.poll()
+        for tenant in added:
+            self.add_tenant(tenant)
+        for tenant in removed:
+            self.remove_tenant(tenant)
+
+    def request_reload(self):
+        """Просит перечитать список студентов, не дожидаясь интервала."""
+        self._reload.set()
+
+    def _watch(self):
+        while True:
+            self._reload.wait(self.registry.interval)
+            self._reload.clear()
+            if not self.running:
+                return
+            try:
+                self.reload()
+            except Exception as error:
+                logger.error("Не удалось обновить список студентов: %s",
+                             error)
+
+    def _run_tenant(self, tenant):
+        if not tenant.active:
+            logger.info("%s удалён из списка, опрос прекращён", tenant)
+            return
+        if not self._claim(tenant):
+            # Прежний владелец ещё держит студента: проверим снова после
+            # его возможного падения.
+            self.schedule(tenant, time.monotonic() + self.shard.heartbeat)
+            return
+        try:
+            with metrics.POLL_SECONDS.labels(tenant.key).time():
+                self.poll(tenant)
+        finally:
+            if self.shard is not None:
+                self.shard.done(tenant.key)
+            delay = self.scheduler.next_delay(
+                tenant.failures, tenant.index.reviewing
+            )
+            if replay.replaying():
+                delay = 0
+            self.schedule(tenant, time.monotonic() + delay)
+
+    def _dispatch(self, tenant):
+        """Отдаёт опрос пулу или откладывает чужого студента.
+
+        Студенты других воркеров не занимают пул: они ждут в parked,
+        пока не перестроится кольцо.
+        """
+        if self.shard is not None and not self.shard.owns(tenant.key):
+            with self.condition:
+                if tenant.active:
+                    self.parked.append(tenant)
+            return
+        self.executor.submit(self._run_tenant, tenant)
+
+    def _unpark(self):
+        # Кольцо перестроилось: отложенные студенты могли стать нашими.
+        with self.condition:
+            now = time.monotonic()
+            for tenant in self.parked:
+                if tenant.active:
+                    heapq.heappush(
+                        self.queue, (now, next(self._counter), tenant)
+                    )
+            self.parked = []
+            self.condition.notify()
+
+    def _beat(self):
+        # Отметка для supervisor: цикл раздачи опросов жив.
+        now = time.monotonic()
+        if not HEARTBEAT_FILE or now - self._last_beat < HEARTBEAT_INTERVAL:
+            return
+        self._last_beat = now
+        with open(HEARTBEAT_FILE, 'a'):
+            pass
+        os.utime(HEARTBEAT_FILE)
+
+    def _next_due(self):
+        with self.condition:
+            while self.running:
+                self._beat()
+                if self.queue:
+                    timeout = self.queue[0][0] - time.monotonic()
+                    if timeout <= 0:
+                        return heapq.heappop(self.queue)[2]
+                else:
+                    timeout = None
+                if HEARTBEAT_FILE:
+                    timeout = min(timeout or HEARTBEAT_INTERVAL,
+                                  HEARTBEAT_INTERVAL)
+                self.condition.wait(timeout)
+        return None
+
+    def run(self):
+        """Раздаёт опросы пулу потоков, пока не вызван stop()."""
+        self.running = True
+        if self.shard is None:
+            self.outbox.restore()
+        self.outbox.start()
+        metrics.OUTBOX_QUEUED.set_function(
+            lambda: self.outbox.stats()['queued']
+        )
+        if self.shard is not None:
+            self.shard.join()
+        if self.registry is not None:
+            threading.Thread(
+                target=self._watch, name='tenants', daemon=True
+            ).start()
+        try:
+            while True:
+                tenant = self._next_due()
+                if tenant is None:
+                    break
+                self._dispatch(tenant)
+        finally:
+            # Начатые опросы дорабатывают, ещё не начатые отменяются.
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.outbox.stop(
+                min(OUTBOX_DRAIN_TIMEOUT, lifecycle.remaining())
+            )
+            self.store.flush()
+            if self.shard is not None:
+                self.shard.leave()
+
+    def wake(self):
+        """Назначает внеочередной опрос всех студентов."""
+        with self.condition:
+            now = time.monotonic()
+            self.queue = [(now, counter, tenant)
+                          for _, counter, tenant in self.queue]
+            heapq.heapify(self.queue)
+            self.condition.notify()
+
+    def stop(self):
+        """Останавливает раздачу опросов."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self._reload.set()
+
+
+def main():
+    """Запускает бота в многопользовательском режиме."""
+    if not homework.TELEGRAM_TOKEN:
+        errormessage = 'Отсутствует обязательная переменная окружения!'
+        logger.critical(errormessage)
+        raise exceptions.TokenError(errormessage)
+    import telegram
+
+    registry = TenantRegistry()
+    tenants = registry.load()
+    pool_size = transport.API_POOL_SIZE
+    transport.configure(pool_size=pool_size and max(pool_size, POLL_WORKERS))
+    metrics.start_server()
+    session = replay.install()
+    bot = replay.wrap_bot(telegram.Bot(token=homework.TELEGRAM_TOKEN))
+    engine = Engine(
+        bot, tenants, shard=sharding.from_env(), registry=registry
+    )
+    lifecycle.on_stop(engine.stop)
+    lifecycle.on_reload(engine.request_reload)
+    lifecycle.on_wake(engine.wake)
+    lifecycle.install()
+    if session is not None:
+        def stop_when_finished():
+            session.finished.wait()
+            engine.stop()
+
+        threading.Thread(target=stop_when_finished, daemon=True).start()
+    engine.run()
+
+
+if __name__ == '__main__':
+    log_config.setup()
+    try:
+        main()
+    except KeyboardInterrupt:
+        logger.info("Завершение работы")
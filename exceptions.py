@@ -18,21 +18,38 @@ class ListError(Exception):
     pass
 
 
-class FormatError(Exception):
+class RecordError(Exception):
+    """Ошибка в отдельной записи ответа API."""
+
+    def __init__(self, message, index=None, field=None):
+        super().__init__(message)
+        self.index = index
+        self.field = field
+
+
+class FormatError(RecordError):
     """Ошибка формата Json."""
     pass
 
 
-class DataTypeError(Exception):
+class DataTypeError(RecordError):
     """Неправильный тип данных"""
     pass
 
 
-class StatusCodeError(Exception):
+class StatusCodeError(PracticumAPIError):
     """Ошибка возникает, если status_code != 200."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class DeadlineError(Exception):
+    """Истёк бюджет времени на цикл опроса."""
     pass
 
 
-class KeyNotFound(Exception):
+class KeyNotFound(RecordError):
     """ошибка поиска ключа"""
     pass
@@ -1,15 +1,23 @@
 import logging
 import os
+import sys
 import time
 from http import HTTPStatus
-from logging import StreamHandler
 from typing import Dict
 
-import requests
-import telegram
 from dotenv import load_dotenv
 
 import exceptions
+import lifecycle
+import log_config
+import metrics
+import replay
+import storage
+import transport
+import validation
+from scheduler import (POLL_DEADLINE, Deadline, PollScheduler,
+                       current_deadline)
+from statuses import REVIEWING, Homework, StatusIndex
 
 
 load_dotenv()
@@ -20,7 +28,13 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
-ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', 5))
+API_READ_TIMEOUT = float(os.getenv('API_READ_TIMEOUT', 30))
+TELEGRAM_TIMEOUT = float(os.getenv('TELEGRAM_TIMEOUT', 10))
+ENDPOINT = os.getenv(
+    'PRACTICUM_ENDPOINT',
+    'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+)
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
 
@@ -39,65 +53,136 @@ def check_tokens():
     variables = [TELEGRAM_TOKEN, PRACTICUM_TOKEN, TELEGRAM_CHAT_ID, ENDPOINT]
     for variable in variables:
         if not variable:
-            logging.critical("Отсутствие обязательных переменных "
-                             f"{variable} окружения во время запуска бота ")
+            logger.critical("Отсутствие обязательных переменных "
+                            "%s окружения во время запуска бота ", variable)
             return False
     return True
 
 
 def send_message(bot, message):
     """Отправляет сообщение в Telegram."""
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_to_chat(bot, chat_id, message, deadline=None):
+    """Отправляет сообщение в указанный чат Telegram.
+
+    Таймаут запроса — TELEGRAM_TIMEOUT, но не больше остатка deadline.
+    """
+    import telegram
+
+    timeout = TELEGRAM_TIMEOUT
+    if deadline is None:
+        deadline = current_deadline()
+    if deadline is not None:
+        timeout = deadline.timeout(timeout)
     try:
-        logging.debug(f"Отправка сообщения {message}")
-        bot.send_message(TELEGRAM_CHAT_ID, message)
+        logger.debug("Отправка сообщения %s", message)
+        with metrics.SEND_SECONDS.labels(chat_id).time():
+            bot.send_message(chat_id, message, timeout=timeout)
     except telegram.error.TelegramError as error:
-        logging.error(f"Ошибка отправки статуса в telegram: {error}")
-        raise exceptions.SendmessageError(f"Ошибка отправки сообщения{error}")
+        logger.error("Ошибка отправки статуса в telegram: %s", error)
+        raise exceptions.SendmessageError(
+            f"Ошибка отправки сообщения{error}"
+        ) from error
     else:
-        logging.info("Успешная отправка сообщения!")
+        logger.info("Успешная отправка сообщения!")
 
 
 def get_api_answer(timestamp):
     """Делает запрос к API."""
-    logging.debug("Отправка запроса к API.")
+    return request_statuses(timestamp, HEADERS)
+
+
+def request_statuses(timestamp, headers, session=None, deadline=None):
+    """Делает запрос к API с заголовками конкретного студента."""
+    return fetch_response(
+        timestamp, headers, session, deadline=deadline
+    ).json()
+
+
+def _timeout(deadline):
+    timeout = (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+    if deadline is None:
+        return timeout
+    return tuple(deadline.timeout(limit) for limit in timeout)
+
+
+def fetch_response(timestamp, headers, session=None, stream=False,
+                   etag=None, deadline=None):
+    """Делает запрос к API и возвращает ответ с кодом 200.
+
+    Без session используется общая сессия из transport. С etag запрос
+    становится условным, и ответ 304 тоже считается успешным. Таймауты
+    соединения и чтения ограничены остатком deadline, повторы после
+    обрыва и ответов 502/503/504 делаются, только пока он не исчерпан.
+    """
+    logger.debug("Отправка запроса к API.")
+    if deadline is None:
+        deadline = current_deadline()
     params = {"from_date": timestamp}
-    try:
-        response = requests.get(ENDPOINT, params, headers=HEADERS)
-    except Exception as error:
-        raise exceptions.PracticumAPIError(f"API недоступен. {error}")
-    if response.status_code != HTTPStatus.OK:
-        raise exceptions.PracticumAPIError(
-            f"API недоступен, код ответа сервера {response.status_code}"
+    http = session or transport.get_session()
+    retries = 0 if session else transport.get_retries()
+    expected = (HTTPStatus.OK,)
+    if etag:
+        headers = dict(headers, **{'If-None-Match': etag})
+        expected = (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED)
+    attempt = 0
+    while True:
+        timeout = _timeout(deadline)
+        try:
+            response = http.get(
+                ENDPOINT, params=params, headers=headers, stream=stream,
+                timeout=timeout
+            )
+        except Exception as error:
+            if (transport.is_retryable(error)
+                    and transport.backoff(attempt, retries, deadline)):
+                attempt += 1
+                continue
+            raise exceptions.PracticumAPIError(f"API недоступен. {error}")
+        if response.status_code in expected:
+            return response
+        if stream:
+            response.close()
+        if (response.status_code in transport.RETRY_STATUSES
+                and transport.backoff(attempt, retries, deadline)):
+            attempt += 1
+            continue
+        raise exceptions.StatusCodeError(
+            f"API недоступен, код ответа сервера {response.status_code}",
+            response.status_code
         )
-    return response.json()
 
 
 def check_response(response):
-    """Проверяет ответ API, и возвращает список домашних работ."""
-    logging.info("Начало проверки ответа сервера")
+    """Проверяет ответ API и возвращает validation.Result.
+
+    В records — корректные домашние работы, в errors — ошибки по
+    отброшенным, каждая из которых уже записана в лог.
+    """
+    logger.info("Начало проверки ответа сервера")
     try:
         homeworks = response["homeworks"]
     except KeyError:
         raise KeyError("Нет ключа в словаре")
     if not isinstance(homeworks, list):
         raise TypeError("Не список")
-    return homeworks
+    return validation.VALIDATOR.validate(homeworks)
 
 
 def parse_status(homework):
     """Возвращает текст сообщения о статусе проверки работы homework."""
     logger.debug("Получаем статус домашней работы")
-    if not isinstance(homework, Dict):
+    if isinstance(homework, Dict):
+        homework = Homework.from_json(homework)
+    elif not isinstance(homework, Homework):
         raise TypeError("homework не является словарем")
-    if "homework_name" not in homework or "status" not in homework:
-        raise KeyError("No homework_status_name or status in homework")
-    homework_name = homework["homework_name"]
-    homework_status = homework["status"]
     try:
-        verdict = HOMEWORK_VERDICTS[homework_status]
-        return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+        verdict = HOMEWORK_VERDICTS[homework.status]
+        return f'Изменился статус проверки работы "{homework.name}". {verdict}'
     except KeyError:
-        logging.error("Статус не определен")
+        logger.error("Статус не определен")
         raise KeyError("Статус домашней работы получен")
 
 
@@ -105,46 +190,84 @@ def main():
     """Основная логика работы бота."""
     if not check_tokens():
         errormessage = 'Отсутствует обязательная переменная окружения!'
-        logging.critical(errormessage)
+        logger.critical(errormessage)
         raise exceptions.TokenError(errormessage)
 
+    import telegram
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
+    bot = replay.wrap_bot(bot)
+    store = storage.open_store()
+    tenant = str(TELEGRAM_CHAT_ID)
+    current_timestamp = store.load_checkpoint(tenant) or int(time.time())
+    index = StatusIndex(store.load_statuses(tenant))
     current_error = None
+    scheduler = PollScheduler.from_env(RETRY_PERIOD)
+    failures = 0
     while True:
+        started = time.monotonic()
         try:
-            response = get_api_answer(current_timestamp)
-            home_works = check_response(response)
-            if len(home_works) > 0:
-                message = parse_status(home_works[0])
-                send_message(bot, message)
+            # Бюджет цикла действует и на запрос к API, и на отправку.
+            with Deadline(POLL_DEADLINE):
+                with metrics.API_SECONDS.labels(tenant).time():
+                    response = get_api_answer(current_timestamp)
+                home_works = check_response(response)
+                changed = index.changes(home_works.records)
+                # Вердикты отправляем раньше сообщений о начале проверки.
+                for home_work in sorted(
+                    changed, key=lambda work: work.status == REVIEWING
+                ):
+                    send_message(bot, parse_status(home_work))
+                    index.commit(home_work)
             current_timestamp = response.get('current_date', current_timestamp)
+            store.checkpoint(tenant, current_timestamp, changed)
+            # Об отброшенных записях сообщаем один раз, пока они не
+            # исчезнут из ответа.
+            errormessage = validation.describe(home_works.errors)
+            if errormessage and current_error != errormessage:
+                send_message(bot, errormessage)
+            current_error = errormessage
         except Exception as error:
+            metrics.record_error(tenant, error)
+            if isinstance(error, exceptions.PracticumAPIError):
+                failures += 1
             errormessage = f'Сбой в работе программы: {error}'
-            logging.critical(errormessage)
+            logger.critical(errormessage)
             if current_error != errormessage:
                 current_error = errormessage
                 send_message(bot, errormessage)
         else:
-            current_error = None
+            failures = 0
         finally:
-            time.sleep(RETRY_PERIOD)
+            metrics.POLL_SECONDS.labels(tenant).observe(
+                time.monotonic() - started
+            )
+            delay = scheduler.next_delay(failures, index.reviewing)
+            if replay.replaying():
+                delay = 0
+            logger.debug("Следующий запрос через %.0f с", delay)
+            try:
+                with lifecycle.interruptible():
+                    time.sleep(delay)
+            except lifecycle.Wakeup:
+                pass
+        if lifecycle.stopping.is_set():
+            store.flush()
+            logger.info("Состояние сохранено, завершение работы")
+            return
 
 
 if __name__ == '__main__':
-    logging.basicConfig(
-        level=logging.DEBUG,
-        filename='main.log',
-        format='%(asctime)s, %(levelname)s, %(message)s'
-    )
-    logger = logging.getLogger(__name__)
-    handler = StreamHandler()
-    logger.addHandler(handler)
-    formatter = logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(message)s'
-    )
-    handler.setFormatter(formatter)
+    if '--preflight' in sys.argv[1:]:
+        import preflight
+        sys.exit(preflight.run())
+    log_config.setup()
+    transport.configure()
+    metrics.start_server()
+    replay.install()
+    lifecycle.install()
     try:
         main()
+    except replay.ReplayFinished:
+        logger.info("Запись воспроизведена")
     except KeyboardInterrupt:
-        logging.info("Заверешние работы")
+        logger.info("Заверешние работы")
@@ -0,0 +1,125 @@
+import logging
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 28))
+
+stopping = threading.Event()
+_stop_callbacks = []
+_wake_callbacks = []
+_reload_callbacks = []
+_sleeping = False
+_deadline = None
+
+
+class Wakeup(Exception):
+    """Ожидание прервано сигналом."""
+    pass
+
+
+def on_stop(callback):
+    """Регистрирует функцию, вызываемую по SIGTERM."""
+    _stop_callbacks.append(callback)
+
+
+def on_wake(callback):
+    """Регистрирует функцию, вызываемую по SIGUSR1."""
+    _wake_callbacks.append(callback)
+
+
+def on_reload(callback):
+    """Регистрирует функцию, вызываемую по SIGHUP."""
+    _reload_callbacks.append(callback)
+
+
+def remaining():
+    """Сколько секунд осталось до принудительного завершения."""
+    if _deadline is None:
+        return float('inf')
+    return max(0.0, _deadline - time.monotonic())
+
+
+def _force_exit():
+    logger.critical(
+        "Штатное завершение не уложилось в %.0f с", SHUTDOWN_TIMEOUT
+    )
+    logging.shutdown()
+    os._exit(1)
+
+
+def _log_later(level, message, *args):
+    # Обработчик сигнала может прервать основной поток посреди записи
+    # в лог, а очередь логов не реентерабельна: пишем из другого потока.
+    threading.Thread(
+        target=logger.log, args=(level, message, *args), daemon=True
+    ).start()
+
+
+def _interrupt():
+    # Исключение из обработчика сигнала прерывает time.sleep, но
+    # бросается только во время ожидания, а не посреди отправки.
+    if _sleeping and threading.current_thread() is threading.main_thread():
+        raise Wakeup
+
+
+def request_stop(signum=None, frame=None):
+    """Начинает штатное завершение с ограничением по времени."""
+    global _deadline
+    if stopping.is_set():
+        return
+    stopping.set()
+    _deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    timer = threading.Timer(SHUTDOWN_TIMEOUT, _force_exit)
+    timer.daemon = True
+    timer.start()
+    _log_later(
+        logging.INFO, "Получен сигнал завершения, дорабатываем текущий цикл"
+    )
+    for callback in _stop_callbacks:
+        callback()
+    _interrupt()
+
+
+def wake(signum=None, frame=None):
+    """Будит ожидающий цикл опроса раньше срока."""
+    _log_later(logging.INFO, "Внеочередной опрос по сигналу %s", signum)
+    for callback in _wake_callbacks:
+        callback()
+    _interrupt()
+
+
+def reload(signum=None, frame=None):
+    """Перечитывает конфигурацию и будит ожидающий цикл."""
+    _log_later(
+        logging.INFO, "Перечитываем конфигурацию по сигналу %s", signum
+    )
+    for callback in _reload_callbacks:
+        callback()
+    _interrupt()
+
+
+def install():
+    """Устанавливает обработчики SIGTERM, SIGHUP и SIGUSR1."""
+    signal.signal(signal.SIGTERM, request_stop)
+    for name, handler in (('SIGHUP', reload), ('SIGUSR1', wake)):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), handler)
+
+
+@contextmanager
+def interruptible():
+    """Окружает ожидание, которое сигнал может прервать через Wakeup."""
+    global _sleeping
+    if stopping.is_set():
+        raise Wakeup
+    _sleeping = True
+    try:
+        yield
+    finally:
+        _sleeping = False
@@ -0,0 +1,103 @@
+import atexit
+import gzip
+import logging
+import os
+import queue
+import shutil
+from logging.handlers import (QueueHandler, QueueListener,
+                              RotatingFileHandler, TimedRotatingFileHandler)
+
+
+LOG_FILE = os.getenv('LOG_FILE', 'main.log')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG')
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+FILE_FORMAT = '%(asctime)s, %(levelname)s, %(name)s, %(message)s'
+CONSOLE_FORMAT = '%(asctime)s [%(levelname)s] %(message)s'
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Передаёт записи в очередь, не форматируя их.
+
+    Сообщение собирается из шаблона и аргументов уже в потоке
+    QueueListener. При переполненной очереди запись отбрасывается.
+    """
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    with open(source, 'rb') as log, gzip.open(dest, 'wb') as archive:
+        shutil.copyfileobj(log, archive)
+    os.remove(source)
+
+
+def file_handler(filename=LOG_FILE, when=LOG_ROTATE_WHEN,
+                 max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """Создаёт обработчик файла с ротацией по размеру или времени.
+
+    Старые файлы сжимаются в gzip.
+    """
+    if when:
+        handler = TimedRotatingFileHandler(
+            filename, when=when, backupCount=backups, encoding='utf-8'
+        )
+    else:
+        handler = RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backups,
+            encoding='utf-8'
+        )
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    return handler
+
+
+def parse_levels(levels):
+    """Разбирает строку вида 'engine=INFO,outbox=WARNING'."""
+    result = {}
+    for item in filter(None, (part.strip() for part in levels.split(','))):
+        name, _, level = item.partition('=')
+        result[name.strip()] = level.strip().upper()
+    return result
+
+
+def setup(filename=LOG_FILE, level=LOG_LEVEL, levels=LOG_LEVELS):
+    """Настраивает логирование через очередь и фоновый поток.
+
+    Возвращает запущенный QueueListener; он останавливается при выходе.
+    """
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    listener = QueueListener(
+        log_queue, file_handler(filename), console,
+        respect_handler_level=True
+    )
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(level)
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
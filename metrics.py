@@ -0,0 +1,262 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import exceptions
+
+
+logger = logging.getLogger(__name__)
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60
+)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return '{' + inner + '}'
+
+
+class Metric:
+    """Базовая метрика с набором меток в формате Prometheus."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self._children = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        """Возвращает метрику для конкретных значений меток."""
+        values = tuple(str(value) for value in values)
+        child = self._children.get(values)
+        if child is None:
+            with self.lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def render(self):
+        """Возвращает строки метрики в текстовом формате Prometheus."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        with self.lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Увеличивает значение."""
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        """Устанавливает значение."""
+        self.value = value
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def _child(self):
+        return _Value()
+
+    def _render_child(self, values, child):
+        labels = _format_labels(self.labelnames, values)
+        return [f'{self.name}{labels} {child.value}']
+
+
+class Gauge(Metric):
+    """Текущее значение; может вычисляться при каждом чтении."""
+
+    kind = 'gauge'
+
+    def _child(self):
+        return _Value()
+
+    def set_function(self, function, *values):
+        """Задаёт функцию, значение которой отдаётся при чтении."""
+        self.labels(*values).function = function
+
+    def _render_child(self, values, child):
+        value = child.value
+        function = getattr(child, 'function', None)
+        if function is not None:
+            value = function()
+        labels = _format_labels(self.labelnames, values)
+        return [f'{self.name}{labels} {value}']
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """Добавляет наблюдение в гистограмму."""
+        with self.lock:
+            self.count += 1
+            self.sum += value
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[position] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        """Замеряет длительность блока."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start)
+
+
+class Histogram(Metric):
+    """Распределение длительностей по корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def _render_child(self, values, child):
+        lines = []
+        with child.lock:
+            counts, count, total = list(child.counts), child.count, child.sum
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            labels = _format_labels(
+                self.labelnames, values, [('le', bound)]
+            )
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, values, [('le', '+Inf')])
+        lines.append(f'{self.name}_bucket{labels} {count}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {total}')
+        lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+API_SECONDS = Histogram(
+    'homework_api_request_seconds',
+    'Длительность запроса к API Практикума', ('tenant',)
+)
+API_ERRORS = Counter(
+    'homework_api_errors_total',
+    'Ошибки запросов к API Практикума', ('tenant', 'exception')
+)
+SEND_SECONDS = Histogram(
+    'homework_telegram_send_seconds',
+    'Длительность отправки сообщения в Telegram', ('tenant',)
+)
+SEND_ERRORS = Counter(
+    'homework_telegram_send_errors_total',
+    'Ошибки отправки сообщений в Telegram', ('tenant', 'exception')
+)
+PARSE_ERRORS = Counter(
+    'homework_parse_errors_total',
+    'Ошибки проверки ответа API', ('tenant', 'exception')
+)
+POLL_SECONDS = Histogram(
+    'homework_poll_iteration_seconds',
+    'Длительность одного цикла опроса', ('tenant',)
+)
+OUTBOX_QUEUED = Gauge(
+    'homework_outbox_queued', 'Сообщений в очереди на отправку'
+)
+
+
+def render():
+    """Возвращает все метрики в текстовом формате Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def record_error(tenant, error):
+    """Учитывает ошибку цикла опроса в подходящем счётчике."""
+    name = type(error).__name__
+    if isinstance(error, exceptions.PracticumAPIError):
+        API_ERRORS.labels(tenant, name).inc()
+    elif isinstance(error, exceptions.SendmessageError):
+        SEND_ERRORS.labels(tenant, name).inc()
+    else:
+        PARSE_ERRORS.labels(tenant, name).inc()
+
+
+def start_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Запускает HTTP-эндпоинт /metrics в фоновом потоке.
+
+    При port == 0 эндпоинт не запускается.
+    """
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    logger.info("Метрики доступны на http://%s:%s/metrics", host, port)
+    return server
@@ -0,0 +1,387 @@
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+
+import exceptions
+import homework
+import metrics
+from breaker import CircuitBreaker
+from statuses import REVIEWING
+
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_RATE = float(os.getenv('TELEGRAM_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', 4))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_MAX_BACKLOG = int(os.getenv('OUTBOX_MAX_BACKLOG', 1000))
+
+PRIORITY_VERDICT = 0
+PRIORITY_NORMAL = 1
+
+
+def is_outage(error):
+    """Отличает сбой Telegram от ошибки конкретного сообщения.
+
+    RetryAfter, BadRequest и Unauthorized относятся к конкретному
+    запросу или чату и предохранитель не размыкают.
+    """
+    import telegram
+
+    if isinstance(error, (telegram.error.BadRequest,
+                          telegram.error.Unauthorized,
+                          telegram.error.RetryAfter)):
+        return False
+    return isinstance(error, telegram.error.NetworkError)
+
+
+def idempotency_key(tenant, homework):
+    """Ключ уведомления: студент, работа, статус и время изменения."""
+    return f'{tenant}:{homework.key}:{homework.status}:{homework.date_updated}'
+
+
+def notification_priority(homework):
+    """Приоритет уведомления: вердикт важнее взятия работы на проверку."""
+    if homework.status == REVIEWING:
+        return PRIORITY_NORMAL
+    return PRIORITY_VERDICT
+
+
+class TokenBucket:
+    """Ограничитель частоты «ведро с токенами».
+
+    reserve() сразу забирает токен и возвращает, сколько секунд нужно
+    подождать, чтобы им можно было воспользоваться.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Забирает токен и возвращает время ожидания в секундах."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class Message:
+    """Сообщение в очереди outbox.
+
+    group объединяет уведомления об одной работе: из них отправляется
+    только последнее поставленное в очередь.
+    """
+
+    __slots__ = ('seq', 'chat_id', 'text', 'key', 'priority', 'group',
+                 'tenant', 'attempt')
+
+    def __init__(self, seq, chat_id, text, key=None,
+                 priority=PRIORITY_NORMAL, group=None, tenant=None):
+        self.seq = seq
+        self.chat_id = chat_id
+        self.text = text
+        self.key = key
+        self.priority = priority
+        self.group = group
+        self.tenant = tenant
+        self.attempt = 0
+
+
+class Outbox:
+    """Фоновая очередь отправки сообщений в Telegram.
+
+    Соблюдает общий лимит бота и лимит на чат, при RetryAfter
+    приостанавливает отправку на указанное Telegram время. Сообщения
+    с ключом идемпотентности сохраняются в store и переживают
+    перезапуск: доставка хотя бы один раз, повтор по ключу отбрасывается.
+
+    Из готовых к отправке сообщений первыми уходят вердикты. Устаревший
+    статус работы, ещё не отправленный, вытесняется новым, а при
+    очереди длиннее max_backlog сообщения с обычным приоритетом
+    отбрасываются.
+    """
+
+    def __init__(self, bot, rate=TELEGRAM_RATE, chat_rate=TELEGRAM_CHAT_RATE,
+                 workers=OUTBOX_WORKERS, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 store=None, max_backlog=OUTBOX_MAX_BACKLOG):
+        self.bot = bot
+        self.store = store
+        self.breaker = CircuitBreaker('telegram')
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.chat_rate = chat_rate
+        self.chat_buckets = {}
+        self.max_attempts = max_attempts
+        self.max_backlog = max_backlog
+        self.queue = []
+        self.ready = []
+        self.condition = threading.Condition()
+        self.paused_until = 0
+        self.in_flight = 0
+        self.running = False
+        self.threads = [
+            threading.Thread(
+                target=self._worker, name=f'outbox-{number}', daemon=True
+            )
+            for number in range(workers)
+        ]
+        self._counter = itertools.count()
+        self._keys = set()
+        self._latest = {}
+        self._stats = {
+            'sent': 0, 'failed': 0, 'retried': 0, 'shed': 0, 'collapsed': 0
+        }
+
+    def start(self):
+        """Запускает потоки отправки."""
+        self.running = True
+        for thread in self.threads:
+            thread.start()
+
+    def restore(self, tenant=None):
+        """Ставит в очередь недоставленные сообщения из store.
+
+        Восстановленные сообщения и так опоздали, поэтому они идут
+        с высоким приоритетом и не отбрасываются.
+        """
+        if self.store is None:
+            return
+        pending = self.store.load_outbox(tenant)
+        for key, chat_id, text in pending:
+            message = Message(
+                next(self._counter), chat_id, text, key, PRIORITY_VERDICT,
+                tenant=tenant
+            )
+            self._push(time.monotonic(), message)
+        if pending:
+            logger.info("Недоставленных сообщений: %d", len(pending))
+
+    def put(self, chat_id, message, key=None, tenant=None,
+            priority=PRIORITY_NORMAL, group=None):
+        """Ставит сообщение в очередь, не дожидаясь отправки.
+
+        Сообщение с ключом key сначала сохраняется в store; повтор
+        ключа не ставится в очередь. Сообщение с обычным приоритетом
+        отбрасывается, если очередь длиннее max_backlog. Возвращает
+        False для повтора и отброшенного сообщения.
+        """
+        if priority > PRIORITY_VERDICT and self.backlog() >= self.max_backlog:
+            self._count('shed')
+            logger.warning("Очередь переполнена, сообщение в чат %s "
+                           "отброшено", chat_id)
+            return False
+        if key is not None and self.store is not None:
+            if not self.store.enqueue(tenant, key, chat_id, message):
+                logger.debug("Повтор сообщения %s пропущен", key)
+                return False
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets.setdefault(
+                chat_id, TokenBucket(self.chat_rate)
+            )
+        ready = time.monotonic() + bucket.reserve()
+        self._push(ready, Message(
+            next(self._counter), chat_id, message, key, priority, group,
+            tenant
+        ))
+        return True
+
+    def release(self, tenants):
+        """Убирает из очереди сообщения студентов, ушедших к другому воркеру.
+
+        Их строки в store остаются неотправленными, и новый владелец
+        сам ставит их в очередь через restore(). Возвращает число
+        убранных сообщений.
+        """
+        tenants = set(tenants)
+        released = 0
+        with self.condition:
+            for heap in (self.queue, self.ready):
+                kept = []
+                for item in heap:
+                    message = item[2]
+                    if message.tenant not in tenants:
+                        kept.append(item)
+                        continue
+                    released += 1
+                    self._keys.discard(message.key)
+                    if self._latest.get(message.group) == message.seq:
+                        del self._latest[message.group]
+                heap[:] = kept
+                heapq.heapify(heap)
+            self.condition.notify_all()
+        if released:
+            logger.info("Передано другому воркеру сообщений: %d", released)
+        return released
+
+    def backlog(self):
+        """Число сообщений, ожидающих отправки."""
+        with self.condition:
+            return len(self.queue) + len(self.ready)
+
+    def _push(self, ready, message, requeue=False):
+        # Повторно поставленное сообщение уже учтено в _keys и _latest.
+        with self.condition:
+            if not requeue:
+                if message.key is not None:
+                    if message.key in self._keys:
+                        return
+                    self._keys.add(message.key)
+                if message.group is not None:
+                    self._latest[message.group] = message.seq
+            heapq.heappush(self.queue, (ready, next(self._counter), message))
+            self.condition.notify_all()
+
+    def _superseded(self, message):
+        return (
+            message.group is not None
+            and self._latest.get(message.group) != message.seq
+        )
+
+    def _pop(self):
+        with self.condition:
+            while self.running:
+                now = time.monotonic()
+                while self.queue and self.queue[0][0] <= now:
+                    _, _, message = heapq.heappop(self.queue)
+                    heapq.heappush(
+                        self.ready, (message.priority, message.seq, message)
+                    )
+                if self.ready and self.paused_until <= now:
+                    _, _, message = heapq.heappop(self.ready)
+                    if self._superseded(message):
+                        self._collapse(message)
+                        continue
+                    self.in_flight += 1
+                    return message
+                if self.ready:
+                    timeout = self.paused_until - now
+                elif self.queue:
+                    timeout = self.queue[0][0] - now
+                else:
+                    timeout = None
+                self.condition.wait(timeout)
+        return None
+
+    def _collapse(self, message):
+        # Вызывается под self.condition.
+        logger.debug("Статус %s устарел и не отправлен", message.key)
+        self._stats['collapsed'] += 1
+        self._keys.discard(message.key)
+        if message.key is not None and self.store is not None:
+            self.store.mark_sent(message.key)
+        self.condition.notify_all()
+
+    def _worker(self):
+        while True:
+            message = self._pop()
+            if message is None:
+                return
+            try:
+                self._deliver(message)
+            except Exception:
+                # Сообщение остаётся в store и уйдёт после перезапуска,
+                # а поток продолжает отправлять остальные.
+                logger.exception(
+                    "Сбой при отправке в чат %s", message.chat_id
+                )
+                self._count('failed', message)
+            finally:
+                with self.condition:
+                    self.in_flight -= 1
+                    self.condition.notify_all()
+
+    def _deliver(self, message):
+        chat_id = message.chat_id
+        if not self.breaker.allow():
+            resume = time.monotonic() + max(self.breaker.retry_in(), 1)
+            with self.condition:
+                self.paused_until = max(self.paused_until, resume)
+            self._push(resume, message, requeue=True)
+            return
+        time.sleep(self.bucket.reserve())
+        try:
+            homework.send_to_chat(self.bot, chat_id, message.text)
+        except exceptions.SendmessageError as error:
+            metrics.record_error(chat_id, error)
+            cause = error.__cause__
+            if is_outage(cause):
+                self.breaker.failure()
+            else:
+                self.breaker.success()
+            if message.attempt + 1 >= self.max_attempts:
+                # Сохранённое сообщение остаётся в store и будет
+                # отправлено снова после перезапуска.
+                self._count('failed', message)
+                logger.error("Сообщение в чат %s не доставлено", chat_id)
+                return
+            self._count('retried')
+            delay = 2 ** message.attempt
+            retry_after = getattr(cause, 'retry_after', None)
+            if retry_after is not None:
+                delay = retry_after
+                with self.condition:
+                    self.paused_until = max(
+                        self.paused_until, time.monotonic() + delay
+                    )
+                logger.warning("Telegram просит подождать %s с", delay)
+            message.attempt += 1
+            self._push(time.monotonic() + delay, message, requeue=True)
+        else:
+            self.breaker.success()
+            if message.key is not None and self.store is not None:
+                self.store.mark_sent(message.key)
+            self._count('sent', message)
+
+    def _count(self, name, message=None):
+        with self.condition:
+            self._stats[name] += 1
+            if message is not None:
+                self._keys.discard(message.key)
+                if self._latest.get(message.group) == message.seq:
+                    del self._latest[message.group]
+
+    def stats(self):
+        """Возвращает глубину очереди и счётчики отправки."""
+        with self.condition:
+            return dict(
+                self._stats, queued=len(self.queue) + len(self.ready),
+                in_flight=self.in_flight
+            )
+
+    def drain(self, timeout=None):
+        """Ждёт, пока очередь опустеет. Возвращает True, если успела."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.queue or self.ready or self.in_flight:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def stop(self, timeout=None):
+        """Дожидается отправки очереди и останавливает потоки."""
+        drained = self.drain(timeout)
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        for thread in self.threads:
+            if thread.is_alive():
+                thread.join(timeout)
+        return drained
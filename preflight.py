@@ -0,0 +1,100 @@
+import os
+import socket
+import subprocess
+import sys
+from urllib.parse import urlsplit
+
+import homework
+
+
+LOCAL_HOSTS = ('localhost', '::1')
+PREFLIGHT_TIMEOUT = float(os.getenv('PREFLIGHT_TIMEOUT', 2))
+HEAVY_MODULES = ('requests', 'telegram', 'sqlite3', 'http.server')
+IMPORT_TIMEOUT = 60
+
+IMPORT_PROBE = '''
+import importlib, sys, time
+started = time.perf_counter()
+importlib.import_module(sys.argv[1])
+print((time.perf_counter() - started) * 1000)
+'''
+
+
+def is_local(host):
+    """Указывает ли адрес на локальную заглушку."""
+    return host in LOCAL_HOSTS or (host or '').startswith('127.')
+
+
+def check_config():
+    """Проверяет переменные окружения и файлы состояния."""
+    problems = []
+    if not homework.check_tokens():
+        problems.append('не заданы обязательные переменные окружения')
+    tenants_file = os.getenv('TENANTS_FILE')
+    if tenants_file and not os.access(tenants_file, os.R_OK):
+        problems.append(f'файл {tenants_file} недоступен для чтения')
+    state_db = os.getenv('STATE_DB')
+    if state_db:
+        directory = os.path.dirname(os.path.abspath(state_db))
+        if not os.access(directory, os.W_OK):
+            problems.append(f'каталог {directory} недоступен для записи')
+    return problems
+
+
+def check_endpoint(url=homework.ENDPOINT, timeout=PREFLIGHT_TIMEOUT):
+    """Проверяет TCP-доступность эндпоинта, если это локальная заглушка.
+
+    Внешние сервисы не опрашиваются: preflight не ходит в сеть.
+    """
+    parts = urlsplit(url)
+    if not is_local(parts.hostname):
+        return None
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    try:
+        socket.create_connection((parts.hostname, port), timeout).close()
+    except OSError as error:
+        return f'заглушка {parts.hostname}:{port} недоступна: {error}'
+    return None
+
+
+def import_report(modules=HEAVY_MODULES):
+    """Замеряет время первого импорта тяжёлых зависимостей в мс.
+
+    Каждый модуль импортируется в отдельном чистом интерпретаторе:
+    в этом процессе многие из них уже загружены вместе с homework.
+    """
+    report = []
+    for name in modules:
+        try:
+            result = subprocess.run(
+                [sys.executable, '-c', IMPORT_PROBE, name],
+                capture_output=True, text=True, timeout=IMPORT_TIMEOUT
+            )
+        except subprocess.TimeoutExpired:
+            report.append((name, None, f'импорт дольше {IMPORT_TIMEOUT} с'))
+            continue
+        if result.returncode:
+            lines = result.stderr.strip().splitlines()
+            report.append((name, None, lines[-1] if lines else ''))
+            continue
+        report.append((name, float(result.stdout), ''))
+    return report
+
+
+def run(out=sys.stdout):
+    """Проверяет конфигурацию и заглушки; возвращает код выхода."""
+    problems = check_config()
+    problem = check_endpoint()
+    if problem:
+        problems.append(problem)
+    print('Время импорта зависимостей:', file=out)
+    for name, elapsed, error in import_report():
+        if elapsed is None:
+            problems.append(f'модуль {name} не импортируется: {error}')
+            continue
+        print(f'  {name:<12} {elapsed:8.1f} мс', file=out)
+    for problem in problems:
+        print(f'Ошибка: {problem}', file=out)
+    if not problems:
+        print('Конфигурация в порядке', file=out)
+    return 1 if problems else 0
@@ -0,0 +1,261 @@
+import atexit
+import collections
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import transport
+
+
+logger = logging.getLogger(__name__)
+
+RECORD_FILE = os.getenv('RECORD_FILE')
+REPLAY_FILE = os.getenv('REPLAY_FILE')
+REPLAY_SPEED = float(os.getenv('REPLAY_SPEED', 1))
+
+_tape = None
+_replay = None
+
+
+class ReplayFinished(BaseException):
+    """Запись закончилась.
+
+    Наследуется от BaseException, чтобы не перехватываться общим
+    except Exception цикла опроса и завершать main().
+    """
+
+
+def _open(path, mode):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def client_key(headers):
+    """Короткий отпечаток токена: сам токен в запись не попадает."""
+    token = (headers or {}).get('Authorization', '')
+    return hashlib.blake2b(token.encode('utf-8'), digest_size=4).hexdigest()
+
+
+class Tape:
+    """Запись обменов с API и Telegram в JSONL (или JSONL.gz).
+
+    В каждой строке — время от начала записи в секундах и тип обмена.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = _open(path, 'w')
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def write(self, kind, **fields):
+        """Добавляет обмен в запись."""
+        entry = {'t': round(time.monotonic() - self.started, 6),
+                 'kind': kind, **fields}
+        line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            if self.file is not None:
+                self.file.write(line + '\n')
+
+    def close(self):
+        """Закрывает файл записи."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class RecordingSession:
+    """Сессия, записывающая ответы API в Tape."""
+
+    def __init__(self, session, tape):
+        self.session = session
+        self.tape = tape
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        """Выполняет запрос и записывает ответ."""
+        response = self.session.get(
+            url, params=params, headers=headers, **kwargs
+        )
+        self.tape.write(
+            'api', client=client_key(headers), params=params,
+            status=response.status_code, etag=response.headers.get('ETag'),
+            body=response.content.decode('utf-8', 'replace')
+        )
+        return response
+
+
+class RecordingBot:
+    """Обёртка бота, записывающая время отправки сообщений."""
+
+    def __init__(self, bot, tape):
+        self.bot = bot
+        self.tape = tape
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Отправляет сообщение и записывает длительность отправки."""
+        started = time.monotonic()
+        try:
+            return self.bot.send_message(chat_id, text, **kwargs)
+        finally:
+            self.tape.write(
+                'send', chat_id=str(chat_id), length=len(text),
+                seconds=round(time.monotonic() - started, 6)
+            )
+
+
+class ReplayResponse:
+    """Ответ API, восстановленный из записи."""
+
+    def __init__(self, status_code, body, etag=None):
+        self.status_code = status_code
+        self.content = body
+        self.headers = {'ETag': etag} if etag else {}
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        """Разбирает тело ответа."""
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=1):
+        """Отдаёт тело частями, как при stream=True."""
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class ReplaySession:
+    """Сессия, отдающая записанные ответы API вместо сети.
+
+    Ответы отдаются по порядку отдельно для каждого токена; токенам,
+    которых нет в записи, по очереди сопоставляются записанные. При
+    speed > 0 ответы выдаются с записанными интервалами, ускоренными
+    в speed раз, при speed == 0 — без задержек.
+    """
+
+    def __init__(self, entries, speed=REPLAY_SPEED):
+        self.speed = speed
+        self.queues = collections.OrderedDict()
+        self.send_seconds = []
+        for entry in entries:
+            if entry['kind'] == 'api':
+                self.queues.setdefault(
+                    entry['client'], collections.deque()
+                ).append(entry)
+            elif entry['kind'] == 'send':
+                self.send_seconds.append(entry['seconds'])
+        self.mapping = {}
+        self.started = None
+        self.requests = 0
+        self.bot = None
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, speed=REPLAY_SPEED):
+        """Читает запись из JSONL или JSONL.gz."""
+        with _open(path, 'r') as file:
+            entries = [json.loads(line) for line in file if line.strip()]
+        logger.info("Загружено обменов из %s: %d", path, len(entries))
+        return cls(entries, speed)
+
+    def _next(self, headers):
+        key = client_key(headers)
+        with self.lock:
+            if self.started is None:
+                self.started = time.monotonic()
+            if key not in self.mapping:
+                recorded = list(self.queues)
+                if key in self.queues or not recorded:
+                    self.mapping[key] = key
+                else:
+                    self.mapping[key] = recorded[
+                        len(self.mapping) % len(recorded)
+                    ]
+            queue = self.queues.get(self.mapping[key])
+            if not queue:
+                self.finished.set()
+                raise ReplayFinished('Запись закончилась')
+            self.requests += 1
+            return queue.popleft()
+
+    def _wait(self, offset):
+        if self.speed <= 0:
+            return
+        delay = self.started + offset / self.speed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        """Возвращает следующий записанный ответ для токена."""
+        entry = self._next(headers)
+        self._wait(entry['t'])
+        return ReplayResponse(
+            entry['status'], entry['body'].encode('utf-8'), entry['etag']
+        )
+
+
+class ReplayBot:
+    """Бот без сети: считает сообщения и имитирует задержку отправки."""
+
+    def __init__(self, seconds=0.0):
+        self.seconds = seconds
+        self.sent = 0
+        self.lock = threading.Lock()
+
+    def send_message(self, chat_id, text, **kwargs):
+        """Учитывает сообщение вместо отправки."""
+        if self.seconds:
+            time.sleep(self.seconds)
+        with self.lock:
+            self.sent += 1
+
+
+def install():
+    """Включает запись или воспроизведение по RECORD_FILE и REPLAY_FILE.
+
+    Возвращает ReplaySession в режиме воспроизведения, иначе None.
+    """
+    global _tape, _replay
+    if RECORD_FILE:
+        _tape = Tape(RECORD_FILE)
+        transport.install(RecordingSession(transport.get_session(), _tape))
+        logger.info("Обмены с API записываются в %s", RECORD_FILE)
+    elif REPLAY_FILE:
+        _replay = ReplaySession.load(REPLAY_FILE)
+        transport.install(_replay)
+    return _replay
+
+
+def replaying():
+    """Идёт ли воспроизведение.
+
+    Темп тогда задают записанные интервалы ответов, а не интервал
+    опроса: при speed == 0 ответы идут подряд без пауз.
+    """
+    return _replay is not None
+
+
+def wrap_bot(bot):
+    """Оборачивает бота для записи или заменяет его при воспроизведении."""
+    if _tape is not None:
+        return RecordingBot(bot, _tape)
+    if _replay is not None:
+        seconds = _replay.send_seconds
+        latency = sum(seconds) / len(seconds) if seconds else 0.0
+        _replay.bot = ReplayBot(
+            latency / _replay.speed if _replay.speed > 0 else 0
+        )
+        return _replay.bot
+    return bot
@@ -0,0 +1,84 @@
+import contextvars
+import os
+import random
+import time
+
+import exceptions
+
+
+REVIEWING_INTERVAL = int(os.getenv('REVIEWING_INTERVAL', 120))
+BACKOFF_BASE = int(os.getenv('BACKOFF_BASE', 30))
+BACKOFF_MAX = int(os.getenv('BACKOFF_MAX', 3600))
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 60))
+
+_current = contextvars.ContextVar('deadline', default=None)
+
+
+class PollScheduler:
+    """Выбирает задержку до следующего опроса API.
+
+    После ошибок API задержка растёт экспоненциально со случайным
+    разбросом, пока работа на проверке — опрос идёт чаще, в остальное
+    время — с обычным интервалом.
+    """
+
+    def __init__(self, interval, reviewing_interval=REVIEWING_INTERVAL,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.interval = interval
+        self.reviewing_interval = min(reviewing_interval, interval)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_env(cls, default_interval):
+        """Создаёт планировщик с интервалом из POLL_INTERVAL."""
+        return cls(int(os.getenv('POLL_INTERVAL', default_interval)))
+
+    def next_delay(self, failures=0, reviewing=False):
+        """Возвращает задержку в секундах до следующего опроса."""
+        if failures:
+            exponent = min(failures - 1, 32)
+            delay = min(self.backoff_max, self.backoff_base * 2 ** exponent)
+            return random.uniform(delay / 2, delay)
+        if reviewing:
+            return self.reviewing_interval
+        return self.interval
+
+
+class Deadline:
+    """Бюджет времени на один цикл опроса.
+
+    Передаётся вниз по вызовам, чтобы каждый сетевой запрос получал
+    таймаут не больше оставшегося времени. Внутри with Deadline(...)
+    бюджет действует и для вызовов, которым его не передали явно.
+    """
+
+    def __init__(self, budget):
+        self.expires = time.monotonic() + budget
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.reset(self._token)
+
+    def remaining(self):
+        """Возвращает оставшееся время в секундах."""
+        return max(0.0, self.expires - time.monotonic())
+
+    def check(self):
+        """Выбрасывает DeadlineError, если бюджет исчерпан."""
+        if self.remaining() <= 0:
+            raise exceptions.DeadlineError("Истёк бюджет времени цикла")
+
+    def timeout(self, limit):
+        """Возвращает таймаут не больше limit и оставшегося времени."""
+        self.check()
+        return min(limit, self.remaining())
+
+
+def current_deadline():
+    """Возвращает бюджет из окружающего with Deadline(...) или None."""
+    return _current.get()
@@ -0,0 +1,225 @@
+import bisect
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from hashlib import blake2b
+
+
+logger = logging.getLogger(__name__)
+
+SHARD_DB = os.getenv('SHARD_DB')
+SHARD_WORKER_ID = os.getenv('SHARD_WORKER_ID')
+SHARD_LEASE_TTL = float(os.getenv('SHARD_LEASE_TTL', 15))
+SHARD_HEARTBEAT = float(os.getenv('SHARD_HEARTBEAT', 5))
+SHARD_REPLICAS = int(os.getenv('SHARD_REPLICAS', 64))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    tenant TEXT PRIMARY KEY,
+    worker_id TEXT NOT NULL
+);
+'''
+
+CLAIM = '''
+INSERT INTO claims (tenant, worker_id) VALUES (?, ?)
+ON CONFLICT (tenant) DO UPDATE SET worker_id = excluded.worker_id
+WHERE claims.worker_id = excluded.worker_id
+   OR claims.worker_id NOT IN (
+       SELECT worker_id FROM workers WHERE expires > ?
+   )
+'''
+
+
+def _point(value):
+    return int.from_bytes(
+        blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Кольцо согласованного хеширования.
+
+    У каждого воркера replicas точек на кольце, поэтому при уходе или
+    появлении воркера переезжает лишь его доля студентов.
+    """
+
+    def __init__(self, members=(), replicas=SHARD_REPLICAS):
+        self.members = tuple(sorted(members))
+        ring = sorted(
+            (_point(f'{member}#{replica}'), member)
+            for member in self.members for replica in range(replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [member for _, member in ring]
+
+    def owner(self, key):
+        """Возвращает воркер, которому принадлежит ключ, или None."""
+        if not self._points:
+            return None
+        position = bisect.bisect(self._points, _point(key))
+        return self._owners[position % len(self._owners)]
+
+
+class Shard:
+    """Доля студентов одного воркера.
+
+    Воркеры отмечаются в общей базе SQLite и продлевают аренду каждые
+    heartbeat секунд; воркер без продления дольше ttl считается
+    упавшим. Студенты распределяются по живым воркерам кольцом
+    согласованного хеширования, а опрос студента дополнительно закреплён
+    строкой в claims: её нельзя перехватить, пока держатель жив, поэтому
+    при перестроении кольца один студент не опрашивается дважды.
+    """
+
+    def __init__(self, path, worker_id=None, ttl=SHARD_LEASE_TTL,
+                 heartbeat=SHARD_HEARTBEAT, replicas=SHARD_REPLICAS):
+        self.worker_id = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.replicas = replicas
+        self.ring = HashRing((), replicas)
+        self.expires = 0
+        self.held = set()
+        self.active = set()
+        self.on_release = None
+        self.on_ring_change = None
+        self.lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.connection = sqlite3.connect(
+            path, timeout=ttl, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def beat(self):
+        """Продлевает аренду, обновляет кольцо и отпускает чужих студентов.
+
+        Возвращает ключи отпущенных студентов.
+        """
+        with self.lock:
+            now = time.time()
+            self.connection.execute(
+                'INSERT OR REPLACE INTO workers VALUES (?, ?)',
+                (self.worker_id, now + self.ttl)
+            )
+            self.expires = now + self.ttl
+            members = [row[0] for row in self.connection.execute(
+                'SELECT worker_id FROM workers WHERE expires > ?', (now,)
+            )]
+            changed = tuple(sorted(members)) != self.ring.members
+            if changed:
+                logger.info("Воркеры шардов: %s", ', '.join(sorted(members)))
+                self.ring = HashRing(members, self.replicas)
+            lost = [
+                key for key in self.held
+                if key not in self.active and not self._owns(key)
+            ]
+        if changed and self.on_ring_change is not None:
+            self.on_ring_change()
+        if not lost:
+            return lost
+        # Состояние студентов должно оказаться в базе раньше, чем их
+        # подхватит новый владелец.
+        if self.on_release is not None:
+            self.on_release(lost)
+        with self.lock:
+            self.connection.executemany(
+                'DELETE FROM claims WHERE tenant = ? AND worker_id = ?',
+                [(key, self.worker_id) for key in lost]
+            )
+            self.held.difference_update(lost)
+        logger.info("Отпущено студентов: %d", len(lost))
+        return lost
+
+    def _owns(self, key):
+        return self.ring.owner(key) == self.worker_id
+
+    def owns(self, key):
+        """Принадлежит ли студент этому воркеру по текущему кольцу."""
+        return self._owns(key)
+
+    def holds(self, key):
+        """Закреплён ли студент за этим воркером."""
+        return key in self.held
+
+    def claim(self, key):
+        """Закрепляет студента перед опросом.
+
+        Возвращает False, если студент принадлежит другому воркеру или
+        прежний владелец ещё жив и не отпустил его. После успешного
+        вызова нужно вызвать done().
+        """
+        with self.lock:
+            now = time.time()
+            if now < self.expires and self._owns(key):
+                cursor = self.connection.execute(
+                    CLAIM, (key, self.worker_id, now)
+                )
+                claimed = cursor.rowcount > 0
+            else:
+                claimed = False
+            if not claimed:
+                self.held.discard(key)
+                return False
+            self.held.add(key)
+            self.active.add(key)
+            return True
+
+    def done(self, key):
+        """Отмечает окончание опроса закреплённого студента."""
+        with self.lock:
+            self.active.discard(key)
+
+    def release(self, key):
+        """Отпускает студента, который больше не опрашивается."""
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM claims WHERE tenant = ? AND worker_id = ?',
+                (key, self.worker_id)
+            )
+            self.held.discard(key)
+
+    def _run(self):
+        while not self._stopped.wait(self.heartbeat):
+            try:
+                self.beat()
+            except Exception as error:
+                logger.error("Не удалось продлить аренду шарда: %s", error)
+
+    def join(self):
+        """Регистрирует воркер и запускает продление аренды."""
+        self.beat()
+        self._thread = threading.Thread(
+            target=self._run, name='shard', daemon=True
+        )
+        self._thread.start()
+
+    def leave(self):
+        """Снимает аренду, чтобы студенты сразу перешли к другим."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM claims WHERE worker_id = ?', (self.worker_id,)
+            )
+            self.connection.execute(
+                'DELETE FROM workers WHERE worker_id = ?', (self.worker_id,)
+            )
+            self.held.clear()
+            self.expires = 0
+
+
+def from_env():
+    """Создаёт шард по SHARD_DB; без неё шардирование выключено."""
+    if not SHARD_DB:
+        return None
+    return Shard(SHARD_DB, SHARD_WORKER_ID)
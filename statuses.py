@@ -0,0 +1,146 @@
+import sys
+from enum import Enum
+
+
+class Status(str, Enum):
+    """Статус проверки домашней работы.
+
+    Члены перечисления — единственные экземпляры строк статусов, поэтому
+    сотни тысяч записей не хранят по своей копии строки.
+    """
+
+    APPROVED = 'approved'
+    REVIEWING = 'reviewing'
+    REJECTED = 'rejected'
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def parse(cls, value):
+        """Возвращает член перечисления или интернированную строку.
+
+        Из ответа API такие записи отсеивает валидатор; сюда они
+        попадают из словарей, переданных в parse_status напрямую, и из
+        сохранённого состояния. Ошибку выдаст parse_status.
+        """
+        status = cls._value2member_map_.get(value)
+        if status is not None:
+            return status
+        return sys.intern(value) if isinstance(value, str) else value
+
+
+REVIEWING = Status.REVIEWING
+
+
+class Homework:
+    """Домашняя работа из ответа API в компактном виде."""
+
+    __slots__ = ('key', 'name', 'status', 'date_updated')
+
+    def __init__(self, key, name, status, date_updated=None):
+        self.key = key
+        self.name = name
+        self.status = status
+        self.date_updated = date_updated
+
+    @classmethod
+    def from_json(cls, data):
+        """Собирает запись из словаря ответа API."""
+        if not isinstance(data, dict):
+            raise TypeError("homework не является словарем")
+        if "homework_name" not in data or "status" not in data:
+            raise KeyError("No homework_status_name or status in homework")
+        name = data["homework_name"]
+        key = data.get('id')
+        return cls(
+            str(name if key is None else key), name,
+            Status.parse(data["status"]),
+            data.get('date_updated')
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, Homework):
+            return NotImplemented
+        return (
+            (self.key, self.name, self.status, self.date_updated)
+            == (other.key, other.name, other.status, other.date_updated)
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Homework({self.key}, {self.name!r}, {self.status})'
+
+
+def _date(homework):
+    return homework.date_updated or ''
+
+
+class StatusIndex:
+    """Последние известные статусы домашних работ одного студента.
+
+    Хранит для каждой работы пару (статус, date_updated). Проверка ответа
+    API обходит только пришедшие в нём работы, а не всю историю.
+    """
+
+    def __init__(self, known=None):
+        self._index = {
+            key: (Status.parse(status), date_updated)
+            for key, (status, date_updated) in (known or {}).items()
+        }
+        self._reviewing = {
+            key for key, (status, _) in self._index.items()
+            if status == REVIEWING
+        }
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def reviewing(self):
+        """Есть ли работы, находящиеся на проверке."""
+        return bool(self._reviewing)
+
+    def is_changed(self, homework):
+        """Проверяет, что статус работы действительно изменился."""
+        previous = self._index.get(homework.key)
+        if previous is None:
+            return True
+        status, date_updated = previous
+        new_date = homework.date_updated
+        if date_updated and new_date and new_date < date_updated:
+            return False
+        return homework.status != status
+
+    def changes(self, homeworks):
+        """Возвращает работы из ответа API, у которых сменился статус.
+
+        homeworks может быть любым итерируемым объектом, в том числе
+        генератором. Повторы одной работы схлопываются в самый свежий,
+        работы возвращаются от старых к новым по date_updated, индекс
+        не изменяется.
+        """
+        latest = {}
+        for homework in homeworks:
+            previous = latest.get(homework.key)
+            if previous is None or _date(homework) >= _date(previous):
+                latest[homework.key] = homework
+        # С индексом сравнивается только самая свежая запись работы:
+        # иначе устаревшая запись из того же ответа заменила бы её.
+        changed = [
+            homework for homework in reversed(latest.values())
+            if self.is_changed(homework)
+        ]
+        changed.sort(key=_date)
+        return changed
+
+    def commit(self, homework):
+        """Запоминает статус работы после отправки уведомления."""
+        key = homework.key
+        status = homework.status
+        self._index[key] = (status, homework.date_updated)
+        if status == REVIEWING:
+            self._reviewing.add(key)
+        else:
+            self._reviewing.discard(key)
@@ -0,0 +1,204 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+STATE_DB = os.getenv('STATE_DB')
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 5))
+OUTBOX_RETENTION = float(os.getenv('OUTBOX_RETENTION', 7 * 24 * 3600))
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS checkpoints (
+    tenant TEXT PRIMARY KEY,
+    from_date INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS statuses (
+    tenant TEXT NOT NULL,
+    homework_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    date_updated TEXT,
+    PRIMARY KEY (tenant, homework_id)
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    chat_id NOT NULL,
+    message TEXT NOT NULL,
+    created REAL NOT NULL,
+    sent REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_sent ON outbox (sent);
+'''
+
+
+class StateStore:
+    """Сохраняет timestamp и последние статусы работ в SQLite.
+
+    Записи копятся в памяти и сбрасываются одной транзакцией не чаще
+    раза в flush_interval секунд.
+    """
+
+    def __init__(self, path, flush_interval=STATE_FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        self._checkpoints = {}
+        self._statuses = {}
+        self._outbox = {}
+        self._sent = {}
+        self._last_flush = time.monotonic()
+
+    def load_checkpoint(self, tenant):
+        """Возвращает сохранённый current_date студента или None."""
+        with self.lock:
+            if tenant in self._checkpoints:
+                return self._checkpoints[tenant]
+            row = self.connection.execute(
+                'SELECT from_date FROM checkpoints WHERE tenant = ?',
+                (tenant,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def load_statuses(self, tenant):
+        """Возвращает {id работы: (статус, date_updated)} студента."""
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT homework_id, status, date_updated FROM statuses '
+                'WHERE tenant = ?',
+                (tenant,)
+            ).fetchall()
+            statuses = {row[0]: (row[1], row[2]) for row in rows}
+            for (owner, key), value in self._statuses.items():
+                if owner == tenant:
+                    statuses[key] = value
+        return statuses
+
+    def checkpoint(self, tenant, current_date, homeworks=()):
+        """Запоминает результат успешного цикла опроса."""
+        with self.lock:
+            self._checkpoints[tenant] = current_date
+            for homework in homeworks:
+                self._statuses[(tenant, homework.key)] = (
+                    str(homework.status), homework.date_updated
+                )
+            self._maybe_flush()
+
+    def enqueue(self, tenant, key, chat_id, message):
+        """Сохраняет сообщение в outbox вместе со следующей записью.
+
+        Возвращает False, если сообщение с таким ключом уже было.
+        """
+        with self.lock:
+            if key in self._outbox or key in self._sent:
+                return False
+            row = self.connection.execute(
+                'SELECT 1 FROM outbox WHERE key = ?', (key,)
+            ).fetchone()
+            if row:
+                return False
+            self._outbox[key] = (
+                tenant, chat_id, message, time.time()
+            )
+            self._maybe_flush()
+        return True
+
+    def mark_sent(self, key):
+        """Отмечает сообщение из outbox доставленным."""
+        with self.lock:
+            self._sent[key] = time.time()
+            self._maybe_flush()
+
+    def load_outbox(self, tenant=None):
+        """Возвращает недоставленные сообщения: (ключ, чат, текст).
+
+        Без tenant — сообщения всех студентов.
+        """
+        query = 'SELECT key, chat_id, message FROM outbox WHERE sent IS NULL'
+        params = ()
+        if tenant is not None:
+            query += ' AND tenant = ?'
+            params = (tenant,)
+        with self.lock:
+            self._flush()
+            return self.connection.execute(
+                query + ' ORDER BY created', params
+            ).fetchall()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self._flush()
+
+    def flush(self):
+        """Записывает накопленные изменения на диск."""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not (self._checkpoints or self._statuses or self._outbox
+                or self._sent):
+            return
+        with self.connection:
+            # Сообщения и контрольная точка попадают в одну транзакцию:
+            # после сбоя нет сдвинутого timestamp без сообщения.
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO outbox VALUES (?, ?, ?, ?, ?, NULL)',
+                [(key,) + row for key, row in self._outbox.items()]
+            )
+            self.connection.executemany(
+                'UPDATE outbox SET sent = ? WHERE key = ?',
+                [(sent, key) for key, sent in self._sent.items()]
+            )
+            if self._sent:
+                self.connection.execute(
+                    'DELETE FROM outbox WHERE sent < ?',
+                    (time.time() - OUTBOX_RETENTION,)
+                )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO checkpoints VALUES (?, ?)',
+                self._checkpoints.items()
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)',
+                [key + value for key, value in self._statuses.items()]
+            )
+        logger.debug(
+            "Сохранено контрольных точек: %d, статусов: %d",
+            len(self._checkpoints), len(self._statuses)
+        )
+        self._checkpoints.clear()
+        self._statuses.clear()
+        self._outbox.clear()
+        self._sent.clear()
+
+    def close(self):
+        """Сбрасывает изменения и закрывает базу."""
+        with self.lock:
+            if self.connection is None:
+                return
+            self._flush()
+            self.connection.close()
+            self.connection = None
+
+
+def open_store(path=STATE_DB):
+    """Открывает хранилище состояния.
+
+    Без STATE_DB состояние хранится только в памяти процесса.
+    """
+    if not path:
+        logger.warning(
+            "STATE_DB не задан: состояние не переживёт перезапуск"
+        )
+    store = StateStore(path or ':memory:')
+    atexit.register(store.close)
+    return store
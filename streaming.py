@@ -0,0 +1,148 @@
+import codecs
+import json
+import os
+
+import exceptions
+import homework
+from validation import VALIDATOR
+
+
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 64 * 1024))
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class StreamedResponse:
+    """Ответ API, который разбирается по мере чтения.
+
+    В памяти одновременно находятся только непрочитанный кусок тела
+    и текущая домашняя работа. HTTP-ответ response закрывается, когда
+    обход homeworks() заканчивается, в том числе ошибкой, и соединение
+    возвращается в пул.
+    """
+
+    def __init__(self, chunks, deadline=None, response=None):
+        self._chunks = iter(chunks)
+        self._response = response
+        self._deadline = deadline
+        self._unicode = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self.current_date = None
+        self.errors = []
+
+    def close(self):
+        """Закрывает HTTP-ответ, даже если тело прочитано не до конца."""
+        response, self._response = self._response, None
+        if response is not None:
+            response.close()
+
+    def _fill(self):
+        """Дочитывает следующий кусок тела. False, если тело кончилось."""
+        if self._eof:
+            return False
+        if self._deadline is not None:
+            self._deadline.check()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            text = self._unicode.decode(b'', final=True)
+        else:
+            text = self._unicode.decode(chunk)
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        while True:
+            while (self._pos < len(self._buffer)
+                   and self._buffer[self._pos] in WHITESPACE):
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise exceptions.FormatError("Ответ API оборван")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise exceptions.FormatError(
+                f"Ожидался символ {char!r} в ответе API"
+            )
+        self._pos += 1
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as error:
+                if not self._fill():
+                    raise exceptions.FormatError(
+                        f"Ошибка формата Json {error}"
+                    )
+                continue
+            # Число в конце буфера могло быть обрезано: дочитываем.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def _items(self):
+        if self._peek() != '[':
+            raise TypeError("Не список")
+        self._pos += 1
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._peek() == ']':
+                self._pos += 1
+                return
+            self._expect(',')
+
+    def homeworks(self):
+        """Отдаёт домашние работы из ответа по одной.
+
+        Проверяет ту же структуру, что и check_response; current_date
+        становится доступен после полного обхода.
+        """
+        try:
+            yield from self._homeworks()
+        finally:
+            self.close()
+
+    def _homeworks(self):
+        if self._peek() != '{':
+            raise TypeError("Ответ API не является словарем")
+        self._pos += 1
+        found = False
+        while self._peek() != '}':
+            key = self._value()
+            self._expect(':')
+            if key == 'homeworks':
+                found = True
+                yield from VALIDATOR.iter_valid(self._items(), self.errors)
+            elif key == 'current_date':
+                self.current_date = self._value()
+            else:
+                self._value()
+            if self._peek() == ',':
+                self._pos += 1
+            elif self._peek() != '}':
+                raise exceptions.FormatError("Ошибка формата Json")
+        self._pos += 1
+        if not found:
+            raise KeyError("Нет ключа в словаре")
+
+
+def stream_statuses(timestamp, headers, session=None, deadline=None):
+    """Делает запрос к API и возвращает ответ для потокового разбора."""
+    response = homework.fetch_response(
+        timestamp, headers, session, stream=True, deadline=deadline
+    )
+    return StreamedResponse(
+        response.iter_content(STREAM_CHUNK_SIZE), deadline, response
+    )
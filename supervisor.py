@@ -0,0 +1,165 @@
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import log_config
+from scheduler import PollScheduler
+
+
+logger = logging.getLogger(__name__)
+
+ENGINE_SCRIPT = os.path.join(os.path.dirname(__file__), 'engine.py')
+SUPERVISOR_PROCESSES = int(os.getenv('SUPERVISOR_PROCESSES', 0))
+SUPERVISOR_HEARTBEAT_TIMEOUT = float(
+    os.getenv('SUPERVISOR_HEARTBEAT_TIMEOUT', 60)
+)
+SUPERVISOR_RESTART_BASE = float(os.getenv('SUPERVISOR_RESTART_BASE', 1))
+SUPERVISOR_RESTART_MAX = float(os.getenv('SUPERVISOR_RESTART_MAX', 60))
+SUPERVISOR_STABLE_AFTER = float(os.getenv('SUPERVISOR_STABLE_AFTER', 300))
+SUPERVISOR_DRAIN_TIMEOUT = float(os.getenv('SUPERVISOR_DRAIN_TIMEOUT', 120))
+SUPERVISOR_CHECK_INTERVAL = float(os.getenv('SUPERVISOR_CHECK_INTERVAL', 1))
+
+
+class Child:
+    """Дочерний процесс движка, обслуживающий свою долю студентов."""
+
+    def __init__(self, slot, heartbeat_file):
+        self.slot = slot
+        self.heartbeat_file = heartbeat_file
+        self.process = None
+        self.started = 0
+        self.restarts = 0
+        self.start_at = 0
+
+    def __repr__(self):
+        return f'Child({self.slot})'
+
+    def last_beat(self):
+        """Время последней отметки или запуска процесса."""
+        try:
+            return max(os.path.getmtime(self.heartbeat_file), self.started)
+        except OSError:
+            return self.started
+
+
+class Supervisor:
+    """Запускает по процессу движка на каждое ядро и следит за ними.
+
+    Процессы делят студентов через шардирование (SHARD_DB) и отмечаются
+    в файле HEARTBEAT_FILE. Упавший или зависший процесс
+    перезапускается с экспоненциальной задержкой, при остановке
+    процессы получают SIGTERM и успевают отправить накопленное.
+    """
+
+    def __init__(self, processes=SUPERVISOR_PROCESSES,
+                 command=(sys.executable, ENGINE_SCRIPT),
+                 heartbeat_timeout=SUPERVISOR_HEARTBEAT_TIMEOUT,
+                 drain_timeout=SUPERVISOR_DRAIN_TIMEOUT):
+        self.command = list(command)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.drain_timeout = drain_timeout
+        self.backoff = PollScheduler(
+            SUPERVISOR_RESTART_MAX, backoff_base=SUPERVISOR_RESTART_BASE,
+            backoff_max=SUPERVISOR_RESTART_MAX
+        )
+        self.directory = tempfile.mkdtemp(prefix='homework-supervisor-')
+        self.children = [
+            Child(slot, os.path.join(self.directory, f'{slot}.heartbeat'))
+            for slot in range(processes or os.cpu_count() or 1)
+        ]
+        self.running = False
+
+    def child_env(self, child):
+        """Окружение дочернего процесса."""
+        env = dict(os.environ)
+        env.setdefault('SHARD_DB', 'shards.db')
+        env.setdefault('STATE_DB', 'state.db')
+        env['SHARD_WORKER_ID'] = f'{socket.gethostname()}-{child.slot}'
+        env['HEARTBEAT_FILE'] = child.heartbeat_file
+        port = int(env.get('METRICS_PORT') or 0)
+        env['METRICS_PORT'] = str(port + child.slot if port else 0)
+        root, ext = os.path.splitext(env.get('LOG_FILE', 'main.log'))
+        env['LOG_FILE'] = f'{root}-{child.slot}{ext}'
+        return env
+
+    def start(self, child):
+        """Запускает дочерний процесс."""
+        if os.path.exists(child.heartbeat_file):
+            os.remove(child.heartbeat_file)
+        child.process = subprocess.Popen(
+            self.command, env=self.child_env(child)
+        )
+        child.started = time.time()
+        logger.info("%s запущен, pid %s", child, child.process.pid)
+
+    def check(self, now=None):
+        """Перезапускает упавшие и зависшие процессы."""
+        now = now or time.time()
+        for child in self.children:
+            process = child.process
+            if process is None:
+                if now >= child.start_at:
+                    self.start(child)
+                continue
+            code = process.poll()
+            if code is None:
+                if now - child.last_beat() <= self.heartbeat_timeout:
+                    if now - child.started >= SUPERVISOR_STABLE_AFTER:
+                        child.restarts = 0
+                    continue
+                logger.error("%s не отвечает, процесс остановлен", child)
+                process.kill()
+                process.wait()
+                code = process.returncode
+            child.restarts += 1
+            delay = self.backoff.next_delay(child.restarts)
+            logger.error(
+                "%s завершился с кодом %s, перезапуск через %.0f с",
+                child, code, delay
+            )
+            child.process = None
+            child.start_at = now + delay
+
+    def run(self):
+        """Следит за процессами до SIGTERM или SIGINT."""
+        self.running = True
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda signum, frame: self.stop())
+        try:
+            while self.running:
+                self.check()
+                time.sleep(SUPERVISOR_CHECK_INTERVAL)
+        finally:
+            self.drain()
+
+    def stop(self):
+        """Просит цикл наблюдения завершиться."""
+        self.running = False
+
+    def drain(self):
+        """Останавливает процессы, давая им дослать сообщения."""
+        alive = [
+            child.process for child in self.children
+            if child.process is not None and child.process.poll() is None
+        ]
+        for process in alive:
+            process.terminate()
+        deadline = time.monotonic() + self.drain_timeout
+        for process in alive:
+            try:
+                process.wait(max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.error("Процесс %s не завершился, kill", process.pid)
+                process.kill()
+                process.wait()
+        logger.info("Все процессы остановлены")
+
+
+if __name__ == '__main__':
+    log_config.setup()
+    Supervisor().run()
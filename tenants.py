@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import time
+
+import exceptions
+from statuses import StatusIndex
+from transport import ResponseCache
+
+
+logger = logging.getLogger(__name__)
+
+TENANTS_FILE = os.getenv('TENANTS_FILE', 'tenants.json')
+TENANTS_RELOAD_INTERVAL = float(os.getenv('TENANTS_RELOAD_INTERVAL', 30))
+
+
+class Tenant:
+    """Студент: токен API Практикума и чат для уведомлений."""
+
+    def __init__(self, practicum_token, chat_id, timestamp=None):
+        self.chat_id = chat_id
+        self.key = str(chat_id)
+        self.set_token(practicum_token)
+        self.active = True
+        self.timestamp = timestamp or int(time.time())
+        self.last_error = None
+        self.last_invalid = None
+        self.failures = 0
+        self.index = StatusIndex()
+        self.response_cache = ResponseCache()
+
+    def __repr__(self):
+        return f'Tenant({self.key})'
+
+    def set_token(self, practicum_token):
+        """Меняет токен API Практикума, сохраняя состояние опроса."""
+        self.practicum_token = practicum_token
+        self.headers = {'Authorization': f'OAuth {practicum_token}'}
+
+
+def check_tenant(item):
+    """Проверяет запись студента так же, как check_tokens окружение."""
+    if not isinstance(item, dict):
+        logger.critical("Запись студента не является словарем")
+        return False
+    for name in ('practicum_token', 'chat_id'):
+        if not item.get(name):
+            logger.critical(
+                "Отсутствует обязательное поле %s у студента %s",
+                name, item.get('chat_id')
+            )
+            return False
+    return True
+
+
+def load_tenants(path=TENANTS_FILE):
+    """Загружает список студентов из JSON-файла.
+
+    Файл содержит список объектов с ключами `practicum_token`
+    и `chat_id`.
+    """
+    logger.debug("Загрузка списка студентов из %s", path)
+    try:
+        with open(path, encoding='utf-8') as file:
+            data = json.load(file)
+    except (OSError, ValueError) as error:
+        raise exceptions.TokenError(
+            f"Не удалось прочитать список студентов {path}: {error}"
+        )
+    if not isinstance(data, list):
+        raise exceptions.TokenError("Список студентов должен быть списком")
+    tenants = {}
+    for item in data:
+        if not check_tenant(item):
+            continue
+        tenant = Tenant(item['practicum_token'], item['chat_id'])
+        if tenant.key in tenants:
+            logger.error("Студент %s указан дважды", tenant.key)
+            continue
+        tenants[tenant.key] = tenant
+    logger.info("Загружено студентов: %d", len(tenants))
+    return list(tenants.values())
+
+
+class TenantRegistry:
+    """Список студентов из файла, перечитываемый при его изменении.
+
+    Изменение определяется по mtime и размеру файла. Ошибка в новом
+    файле не сбрасывает текущий список.
+    """
+
+    def __init__(self, path=TENANTS_FILE, interval=TENANTS_RELOAD_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.tenants = {}
+        self._signature = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def load(self):
+        """Загружает список и возвращает студентов."""
+        self._signature = self._stat()
+        tenants = load_tenants(self.path)
+        self.tenants = {tenant.key: tenant for tenant in tenants}
+        return tenants
+
+    def poll(self):
+        """Перечитывает файл, если он изменился.
+
+        Возвращает (добавленные, удалённые) студенты; у оставшихся
+        студентов со сменившимся токеном токен обновляется на месте.
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            return [], []
+        self._signature = signature
+        try:
+            tenants = load_tenants(self.path)
+        except exceptions.TokenError as error:
+            logger.error("Список студентов не обновлён: %s", error)
+            return [], []
+        loaded = {tenant.key: tenant for tenant in tenants}
+        added = [
+            tenant for key, tenant in loaded.items()
+            if key not in self.tenants
+        ]
+        removed = [
+            tenant for key, tenant in self.tenants.items()
+            if key not in loaded
+        ]
+        for key, tenant in self.tenants.items():
+            if key in loaded:
+                token = loaded[key].practicum_token
+                if token != tenant.practicum_token:
+                    logger.info("Обновлён токен студента %s", key)
+                    tenant.set_token(token)
+                loaded[key] = tenant
+        self.tenants = loaded
+        if added or removed:
+            logger.info(
+                "Список студентов обновлён: +%d, -%d",
+                len(added), len(removed)
+            )
+        return added, removed
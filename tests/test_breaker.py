@@ -0,0 +1,29 @@
+import breaker
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold(self):
+        circuit = breaker.CircuitBreaker('test', threshold=2,
+                                         probe_interval=60)
+        circuit.failure()
+        assert circuit.allow()
+        circuit.failure()
+        assert circuit.state == breaker.OPEN
+        assert not circuit.allow(), (
+            'Разомкнутый предохранитель не должен пропускать запросы.'
+        )
+
+    def test_half_open_probe(self):
+        circuit = breaker.CircuitBreaker('test', threshold=1,
+                                         probe_interval=0)
+        circuit.failure()
+        assert circuit.allow(), 'После паузы должен пройти пробный запрос.'
+        assert circuit.state == breaker.HALF_OPEN
+        assert not circuit.allow(), 'Пробный запрос должен быть один.'
+        circuit.failure()
+        assert circuit.state == breaker.OPEN
+        assert circuit.allow()
+        circuit.success()
+        assert circuit.state == breaker.CLOSED
+        assert circuit.allow()
@@ -0,0 +1,197 @@
+import json
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import utils
+
+
+@pytest.fixture
+def engine_module():
+    import engine
+    return engine
+
+
+@pytest.fixture
+def tenant():
+    from tenants import Tenant
+    return Tenant('sometoken', 12345, timestamp=1000198000)
+
+
+def mock_response_get(data):
+    def mocked_response(*args, **kwargs):
+        response = utils.MockResponseGET(
+            *args, random_timestamp=data['current_date'],
+            http_status=HTTPStatus.OK, **kwargs
+        )
+        response.json = lambda: data
+        response.content = json.dumps(data).encode('utf-8')
+        response.headers = {}
+        return response
+    return mocked_response
+
+
+class TestEngine:
+
+    def test_poll_sends_to_tenant_chat(self, monkeypatch, engine_module,
+                                       tenant, random_message):
+        data = {
+            'homeworks': [{'homework_name': 'hw123', 'status': 'approved'}],
+            'current_date': 1000198991
+        }
+        monkeypatch.setattr(requests, 'get', mock_response_get(data))
+        bot = utils.MockTelegramBot()
+        engine = engine_module.Engine(bot, [])
+        engine.outbox.start()
+        engine.poll(tenant)
+        assert engine.outbox.stop(timeout=5)
+        assert bot.chat_id == 12345, (
+            'Сообщение должно уходить в чат студента.'
+        )
+        assert 'hw123' in bot.text
+        assert tenant.timestamp == 1000198991, (
+            'После успешного опроса timestamp студента должен сдвигаться.'
+        )
+
+    def test_poll_error_sent_once(self, monkeypatch, engine_module, tenant):
+        def mock_get_with_exception(*args, **kwargs):
+            raise requests.RequestException('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_get_with_exception)
+        engine = engine_module.Engine(utils.MockTelegramBot(), [])
+        engine.poll(tenant)
+        engine.poll(tenant)
+        assert engine.outbox.stats()['queued'] == 1, (
+            'Одинаковая ошибка не должна отправляться повторно.'
+        )
+        assert tenant.timestamp == 1000198000
+
+    def test_repeated_statuses_are_not_resent(self, monkeypatch,
+                                              engine_module, tenant):
+        first = {'id': 1, 'homework_name': 'hw1', 'status': 'approved',
+                 'date_updated': '2022-01-02T00:00:00Z'}
+        stale = dict(first, status='rejected',
+                     date_updated='2022-01-01T00:00:00Z')
+        new = {'id': 2, 'homework_name': 'hw2', 'status': 'reviewing'}
+        engine = engine_module.Engine(utils.MockTelegramBot(), [])
+        for homeworks in ([first], [stale, first, new], [first, new]):
+            data = {'homeworks': homeworks, 'current_date': 1000198000}
+            monkeypatch.setattr(requests, 'get', mock_response_get(data))
+            engine.poll(tenant)
+        assert engine.outbox.stats()['queued'] == 2, (
+            'Повтор и устаревший статус из перекрывающегося окна '
+            'не должны отправляться снова.'
+        )
+
+    def test_invalid_records_are_reported_once(self, monkeypatch,
+                                               engine_module, tenant):
+        valid = {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}
+        unknown = {'id': 2, 'homework_name': 'hw2', 'status': 'lost'}
+        engine = engine_module.Engine(utils.MockTelegramBot(), [])
+        for homeworks in ([unknown, valid], [unknown]):
+            data = {'homeworks': homeworks, 'current_date': 1000198000}
+            monkeypatch.setattr(requests, 'get', mock_response_get(data))
+            engine.poll(tenant)
+        assert engine.outbox.stats()['queued'] == 2, (
+            'О записи с неизвестным статусом студент узнаёт один раз, '
+            'остальные работы ответа обрабатываются.'
+        )
+        assert 'lost' in tenant.last_invalid
+
+    def test_poll_resumes_from_checkpoint(self, monkeypatch, engine_module,
+                                          tenant, tmp_path):
+        import storage
+        from tenants import Tenant
+        data = {'homeworks': [], 'current_date': 1000198991}
+        monkeypatch.setattr(requests, 'get', mock_response_get(data))
+        store = storage.StateStore(str(tmp_path / 'state.db'))
+        engine = engine_module.Engine(utils.MockTelegramBot(), [], store=store)
+        engine.poll(tenant)
+        store.close()
+
+        restarted = Tenant('sometoken', 12345, timestamp=1000198000)
+        store = storage.StateStore(str(tmp_path / 'state.db'))
+        engine_module.Engine(utils.MockTelegramBot(), [restarted], store=store)
+        assert restarted.timestamp == 1000198991, (
+            'После перезапуска опрос должен продолжаться с контрольной точки.'
+        )
+
+    def test_open_breaker_skips_poll(self, monkeypatch, engine_module,
+                                     tenant):
+        calls = []
+
+        def mock_get_with_exception(*args, **kwargs):
+            calls.append(1)
+            raise requests.ConnectionError('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_get_with_exception)
+        engine = engine_module.Engine(utils.MockTelegramBot(), [])
+        for _ in range(engine.api_breaker.threshold + 3):
+            engine.poll(tenant)
+        assert len(calls) == engine.api_breaker.threshold, (
+            'При разомкнутом предохранителе запросы к API не отправляются.'
+        )
+
+    def test_failed_probe_reopens_breaker(self, monkeypatch, engine_module,
+                                          tenant):
+        from breaker import OPEN
+
+        def mock_html_response(*args, **kwargs):
+            response = mock_response_get({'current_date': 0})(*args, **kwargs)
+            response.json = lambda: json.loads('<html>')
+            return response
+
+        monkeypatch.setattr(requests, 'get', mock_html_response)
+        engine = engine_module.Engine(utils.MockTelegramBot(), [])
+        engine.api_breaker._set_state(OPEN)
+        engine.api_breaker.opened_at = -engine.api_breaker.probe_interval
+        engine.poll(tenant)
+        assert engine.api_breaker.state == OPEN, (
+            'Неудачная проба должна снова размыкать предохранитель, '
+            'а не оставлять его в пробном состоянии.'
+        )
+
+    def test_foreign_tenants_wait_for_ring_change(self, engine_module,
+                                                  tenant, tmp_path):
+        from sharding import Shard
+        path = str(tmp_path / 'shards.db')
+        first = Shard(path, 'first', ttl=60)
+        second = Shard(path, 'second', ttl=60)
+        for shard in (first, second, first):
+            shard.beat()
+        if first.owns(tenant.key):
+            first, second = second, first
+        engine = engine_module.Engine(utils.MockTelegramBot(), [],
+                                      shard=first)
+        engine._dispatch(tenant)
+        assert engine.parked == [tenant] and not engine.queue, (
+            'Студента другого воркера не нужно отдавать пулу опросов.'
+        )
+        second.leave()
+        first.beat()
+        assert not engine.parked and engine.queue[0][2] is tenant, (
+            'После перестроения кольца студент должен вернуться в очередь.'
+        )
+
+    def test_stale_tenants_are_polled_first(self, engine_module, tenant):
+        import time
+        from tenants import Tenant
+        fresh = Tenant('othertoken', 54321)
+        engine = engine_module.Engine(utils.MockTelegramBot(), [fresh, tenant])
+        due, _, first = engine.queue[0]
+        assert first is tenant and due <= time.monotonic(), (
+            'После долгого простоя студента нужно опросить сразу.'
+        )
+
+    def test_removed_tenant_is_not_polled(self, monkeypatch, engine_module,
+                                          tenant):
+        calls = []
+        monkeypatch.setattr(requests, 'get', lambda *a, **k: calls.append(1))
+        engine = engine_module.Engine(utils.MockTelegramBot(), [])
+        engine.add_tenant(tenant)
+        engine.remove_tenant(tenant)
+        engine._run_tenant(engine.queue.pop()[2])
+        assert not calls and not engine.queue, (
+            'Удалённого студента нельзя опрашивать и планировать снова.'
+        )
@@ -0,0 +1,69 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import lifecycle
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(lifecycle, 'stopping', threading.Event())
+    monkeypatch.setattr(lifecycle, '_stop_callbacks', [])
+    monkeypatch.setattr(lifecycle, '_wake_callbacks', [])
+    monkeypatch.setattr(lifecycle, '_reload_callbacks', [])
+    monkeypatch.setattr(lifecycle, '_deadline', None)
+    monkeypatch.setattr(lifecycle, '_force_exit', lambda: None)
+    handlers = {
+        signum: signal.getsignal(signum)
+        for signum in (signal.SIGTERM, signal.SIGHUP, signal.SIGUSR1)
+    }
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+class TestLifecycle:
+
+    def test_signal_interrupts_sleep(self, fresh_state):
+        woken = []
+        lifecycle.on_wake(lambda: woken.append(True))
+        lifecycle.install()
+        threading.Timer(
+            0.1, os.kill, (os.getpid(), signal.SIGUSR1)
+        ).start()
+        started = time.monotonic()
+        with pytest.raises(lifecycle.Wakeup):
+            with lifecycle.interruptible():
+                time.sleep(5)
+        assert time.monotonic() - started < 2
+        assert woken and not lifecycle.stopping.is_set()
+
+    def test_stop_runs_callbacks_and_skips_next_sleep(self, fresh_state):
+        stopped = []
+        lifecycle.on_stop(lambda: stopped.append(True))
+        lifecycle.request_stop()
+        assert stopped and lifecycle.stopping.is_set()
+        assert lifecycle.remaining() <= lifecycle.SHUTDOWN_TIMEOUT
+        with pytest.raises(lifecycle.Wakeup):
+            with lifecycle.interruptible():
+                time.sleep(5)
+
+    def test_handler_logs_outside_main_thread(self, fresh_state,
+                                              monkeypatch):
+        logged = threading.Event()
+        threads = []
+
+        def log(*args):
+            threads.append(threading.current_thread())
+            logged.set()
+
+        monkeypatch.setattr(lifecycle.logger, 'log', log)
+        lifecycle.request_stop()
+        assert logged.wait(5)
+        assert threads[0] is not threading.main_thread(), (
+            'Обработчик сигнала не должен писать в лог из основного '
+            'потока: запись в очередь логов не реентерабельна.'
+        )
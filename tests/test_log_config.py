@@ -0,0 +1,32 @@
+import gzip
+import logging
+
+import log_config
+
+
+class TestLogConfig:
+
+    def test_parse_levels(self):
+        assert log_config.parse_levels('engine=info, outbox=WARNING,') == {
+            'engine': 'INFO', 'outbox': 'WARNING'
+        }
+
+    def test_rotated_files_are_compressed(self, tmp_path):
+        filename = tmp_path / 'main.log'
+        handler = log_config.file_handler(
+            str(filename), when=None, max_bytes=200, backups=2
+        )
+        logger = logging.getLogger('test_log_config')
+        logger.propagate = False
+        logger.addHandler(handler)
+        try:
+            for number in range(20):
+                logger.warning('Сообщение номер %d', number)
+        finally:
+            logger.removeHandler(handler)
+            handler.close()
+        archive = tmp_path / 'main.log.1.gz'
+        assert archive.exists(), 'Старые логи должны сжиматься в gzip.'
+        with gzip.open(archive, 'rt', encoding='utf-8') as file:
+            assert 'Сообщение номер' in file.read()
+        assert not (tmp_path / 'main.log.3.gz').exists()
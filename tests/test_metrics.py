@@ -0,0 +1,31 @@
+import exceptions
+import metrics
+
+
+class TestMetrics:
+
+    def test_render_prometheus_text(self):
+        histogram = metrics.Histogram(
+            'test_seconds', 'Тестовая гистограмма', ('tenant',),
+            buckets=(0.1, 1)
+        )
+        histogram.labels('12345').observe(0.5)
+        text = '\n'.join(histogram.render())
+        assert '# TYPE test_seconds histogram' in text
+        assert 'test_seconds_bucket{tenant="12345",le="0.1"} 0' in text
+        assert 'test_seconds_bucket{tenant="12345",le="1"} 1' in text
+        assert 'test_seconds_count{tenant="12345"} 1' in text
+        metrics.REGISTRY.remove(histogram)
+
+    def test_errors_are_labelled_by_exception_class(self):
+        metrics.record_error('12345', exceptions.PracticumAPIError('down'))
+        metrics.record_error('12345', KeyError('homeworks'))
+        text = metrics.render()
+        assert (
+            'homework_api_errors_total'
+            '{tenant="12345",exception="PracticumAPIError"}'
+        ) in text
+        assert (
+            'homework_parse_errors_total'
+            '{tenant="12345",exception="KeyError"}'
+        ) in text
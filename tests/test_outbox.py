@@ -0,0 +1,162 @@
+import time
+
+import telegram
+
+import storage
+import utils
+from outbox import (PRIORITY_VERDICT, Outbox, TokenBucket, idempotency_key,
+                    notification_priority)
+from statuses import Homework, Status
+
+
+class RetryAfterBot(utils.MockTelegramBot):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise telegram.error.RetryAfter(0.05)
+        super().send_message(chat_id, text, **kwargs)
+
+
+class RecordingBot(utils.MockTelegramBot):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.texts = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.texts.append(text)
+        super().send_message(chat_id, text, **kwargs)
+
+
+class CrashingBot(RecordingBot):
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if not self.texts:
+            self.texts.append(None)
+            raise RuntimeError('Something wrong')
+        super().send_message(chat_id, text, **kwargs)
+
+
+class TestOutbox:
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=10)
+        assert bucket.reserve() == 0
+        assert 0 < bucket.reserve() <= 0.1
+
+    def test_retry_after_is_honored(self):
+        bot = RetryAfterBot()
+        outbox = Outbox(bot, workers=1)
+        outbox.start()
+        outbox.put(12345, 'Test_message_check')
+        assert outbox.stop(timeout=5)
+        assert bot.text == 'Test_message_check'
+        stats = outbox.stats()
+        assert stats['sent'] == 1 and stats['retried'] == 1, (
+            'После RetryAfter сообщение должно быть отправлено повторно.'
+        )
+
+    def test_durable_messages_are_deduplicated_and_restored(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = storage.StateStore(path)
+        homework = Homework('1', 'hw1', Status.APPROVED, '2022-01-01')
+        key = idempotency_key('12345', homework)
+        outbox = Outbox(utils.MockTelegramBot(), store=store)
+        assert outbox.put(12345, 'Работа принята', key=key, tenant='12345')
+        assert not outbox.put(12345, 'Работа принята', key=key,
+                              tenant='12345'), (
+            'Сообщение с тем же ключом не должно отправляться повторно.'
+        )
+        store.close()
+
+        store = storage.StateStore(path)
+        bot = utils.MockTelegramBot()
+        restarted = Outbox(bot, workers=1, store=store)
+        restarted.restore()
+        restarted.start()
+        assert restarted.stop(timeout=5)
+        assert bot.text == 'Работа принята', (
+            'Недоставленное сообщение должно пережить перезапуск.'
+        )
+        assert store.load_outbox() == []
+
+    def test_verdicts_go_first_and_stale_statuses_collapse(self):
+        reviewing = Homework('1', 'hw1', Status.REVIEWING)
+        approved = Homework('1', 'hw1', Status.APPROVED)
+        rejected = Homework('2', 'hw2', Status.REJECTED)
+        bot = RecordingBot()
+        outbox = Outbox(bot, rate=1000, chat_rate=1000, workers=1)
+        outbox.put(1, 'Взята в ревью', group='1:1',
+                   priority=notification_priority(reviewing))
+        outbox.put(2, 'Ошибка')
+        outbox.put(1, 'Вернули', group='1:2',
+                   priority=notification_priority(rejected))
+        outbox.put(1, 'Принята', group='1:1',
+                   priority=notification_priority(approved))
+        time.sleep(0.05)
+        outbox.start()
+        assert outbox.stop(timeout=5)
+        assert bot.texts == ['Вернули', 'Принята', 'Ошибка'], (
+            'Вердикты должны уходить первыми, устаревший статус работы '
+            'не должен отправляться.'
+        )
+        assert outbox.stats()['collapsed'] == 1
+
+    def test_low_priority_is_shed_over_backlog(self):
+        outbox = Outbox(utils.MockTelegramBot(), max_backlog=2)
+        assert outbox.put(1, 'Первое')
+        assert outbox.put(2, 'Второе')
+        assert not outbox.put(3, 'Взята в ревью'), (
+            'При переполнении очереди обычные сообщения отбрасываются.'
+        )
+        assert outbox.put(4, 'Принята', priority=PRIORITY_VERDICT), (
+            'Вердикт не должен отбрасываться при переполнении.'
+        )
+        stats = outbox.stats()
+        assert stats['shed'] == 1 and stats['queued'] == 3
+
+    def test_open_breaker_requeues_keyed_message(self):
+        from breaker import OPEN
+        bot = RecordingBot()
+        outbox = Outbox(bot, workers=1)
+        outbox.breaker._set_state(OPEN)
+        outbox.breaker.opened_at = time.monotonic()
+        outbox.start()
+        assert outbox.put(12345, 'Работа принята', key='k1')
+        assert not outbox.drain(timeout=0.2)
+        assert not bot.texts and outbox.stats()['queued'] == 1, (
+            'Сообщение, не пропущенное предохранителем, должно '
+            'оставаться в очереди.'
+        )
+        outbox.stop(timeout=0)
+
+    def test_unexpected_error_does_not_kill_worker(self):
+        bot = CrashingBot()
+        outbox = Outbox(bot, rate=1000, chat_rate=1000, workers=1)
+        outbox.start()
+        outbox.put(1, 'Первое')
+        outbox.put(2, 'Второе')
+        assert outbox.stop(timeout=5)
+        assert bot.texts == [None, 'Второе'], (
+            'После непредвиденной ошибки поток должен отправлять дальше.'
+        )
+        assert outbox.stats()['failed'] == 1
+
+    def test_released_tenant_messages_stay_in_store(self, tmp_path):
+        store = storage.StateStore(str(tmp_path / 'state.db'))
+        outbox = Outbox(utils.MockTelegramBot(), store=store)
+        assert outbox.put(1, 'Первому', key='a:1', tenant='a')
+        assert outbox.put(2, 'Второму', key='b:1', tenant='b')
+        assert outbox.release(['a']) == 1
+        assert outbox.stats()['queued'] == 1, (
+            'Сообщения отпущенного студента должны уйти из очереди, '
+            'чтобы их не отправили оба воркера.'
+        )
+        assert store.load_outbox('a') == [('a:1', 1, 'Первому')], (
+            'Новый владелец должен найти сообщение в базе.'
+        )
+        outbox.restore('a')
+        assert outbox.stats()['queued'] == 2
+        store.close()
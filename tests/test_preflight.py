@@ -0,0 +1,43 @@
+import io
+import socket
+
+import preflight
+
+
+class TestPreflight:
+
+    def test_remote_endpoint_is_not_contacted(self, monkeypatch):
+        def fail(*args, **kwargs):
+            raise AssertionError('preflight не должен ходить во внешнюю сеть')
+
+        monkeypatch.setattr(socket, 'create_connection', fail)
+        assert preflight.check_endpoint('https://practicum.yandex.ru/') is None
+
+    def test_unreachable_local_stand_in(self):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        problem = preflight.check_endpoint(f'http://127.0.0.1:{port}/')
+        assert problem and str(port) in problem
+
+    def test_run_prints_import_report(self):
+        out = io.StringIO()
+        code = preflight.run(out)
+        assert 'requests' in out.getvalue()
+        assert code in (0, 1)
+
+    def test_preloaded_module_is_measured_cold(self):
+        import sqlite3  # noqa: F401
+
+        [(name, elapsed, error)] = preflight.import_report(
+            ('sqlite3', )
+        )
+        assert elapsed and elapsed > 0 and not error, (
+            'Уже загруженный модуль нужно замерять в чистом интерпретаторе.'
+        )
+
+    def test_missing_module_is_reported(self):
+        [(name, elapsed, error)] = preflight.import_report(
+            ('no_such_module_here', )
+        )
+        assert elapsed is None and 'no_such_module_here' in error
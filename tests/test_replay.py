@@ -0,0 +1,96 @@
+import json
+import time
+
+import pytest
+
+import homework
+import replay
+import transport
+
+
+class FakeResponse:
+    status_code = 200
+    headers = {'ETag': '"v1"'}
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FakeSession:
+
+    def __init__(self, payloads):
+        self.payloads = list(payloads)
+
+    def get(self, url, **kwargs):
+        return FakeResponse(self.payloads.pop(0))
+
+
+PAYLOADS = [
+    {'homeworks': [], 'current_date': 100},
+    {'homeworks': [{'homework_name': 'hw', 'status': 'approved'}],
+     'current_date': 200},
+]
+
+
+class TestReplay:
+
+    def test_recorded_exchanges_replay_in_order(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'tape.jsonl.gz')
+        tape = replay.Tape(path)
+        monkeypatch.setattr(transport, '_session', replay.RecordingSession(
+            FakeSession(PAYLOADS), tape
+        ))
+        for payload in PAYLOADS:
+            assert homework.get_api_answer(0) == payload
+        tape.close()
+
+        session = replay.ReplaySession.load(path, speed=0)
+        monkeypatch.setattr(transport, '_session', session)
+        for payload in PAYLOADS:
+            assert homework.get_api_answer(0) == payload
+        with pytest.raises(replay.ReplayFinished):
+            homework.get_api_answer(0)
+        assert session.finished.is_set()
+
+    def test_token_is_not_written_to_tape(self, tmp_path):
+        path = tmp_path / 'tape.jsonl'
+        tape = replay.Tape(str(path))
+        session = replay.RecordingSession(FakeSession(PAYLOADS), tape)
+        session.get('url', headers={'Authorization': 'OAuth secret'})
+        tape.close()
+        assert 'secret' not in path.read_text(encoding='utf-8')
+
+    def test_unknown_tokens_share_recorded_traffic(self):
+        entries = [
+            {'t': 0, 'kind': 'api', 'client': 'recorded', 'status': 200,
+             'etag': None, 'body': json.dumps(payload)}
+            for payload in PAYLOADS
+        ]
+        session = replay.ReplaySession(entries, speed=0)
+        response = session.get('url', headers={'Authorization': 'OAuth new'})
+        assert response.json() == PAYLOADS[0]
+
+    def test_main_is_paced_by_replay(self, monkeypatch):
+        import telegram
+        entries = [
+            {'t': 0, 'kind': 'api', 'client': 'recorded', 'status': 200,
+             'etag': None, 'body': json.dumps(payload)}
+            for payload in PAYLOADS
+        ]
+        session = replay.ReplaySession(entries, speed=0)
+        delays = []
+        monkeypatch.setattr(replay, '_replay', session)
+        monkeypatch.setattr(transport, '_session', session)
+        monkeypatch.setattr(telegram, 'Bot', lambda **kwargs: None)
+        monkeypatch.setattr(time, 'sleep', delays.append)
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID'):
+            monkeypatch.setattr(homework, name, 'replay')
+        with pytest.raises(replay.ReplayFinished):
+            homework.main()
+        assert session.bot.sent == 1
+        assert delays and not any(delays), (
+            'При воспроизведении темп задаёт запись, а не интервал опроса.'
+        )
@@ -0,0 +1,50 @@
+import pytest
+
+import exceptions
+from scheduler import Deadline, PollScheduler
+
+
+class TestPollScheduler:
+
+    def test_idle_and_reviewing_intervals(self):
+        scheduler = PollScheduler(600, reviewing_interval=120)
+        assert scheduler.next_delay() == 600
+        assert scheduler.next_delay(reviewing=True) == 120
+
+    def test_backoff_grows_and_is_capped(self):
+        scheduler = PollScheduler(600, backoff_base=10, backoff_max=100)
+        for failures, ceiling in ((1, 10), (2, 20), (3, 40), (10, 100)):
+            delay = scheduler.next_delay(failures=failures)
+            assert ceiling / 2 <= delay <= ceiling, (
+                'Задержка после ошибок должна расти экспоненциально '
+                'и не превышать backoff_max.'
+            )
+
+
+class TestDeadline:
+
+    def test_timeout_is_capped_by_budget(self):
+        deadline = Deadline(0.5)
+        assert deadline.timeout(30) <= 0.5
+        assert deadline.timeout(0.1) == 0.1
+
+    def test_expired_deadline_raises(self):
+        deadline = Deadline(0)
+        with pytest.raises(exceptions.DeadlineError):
+            deadline.timeout(30)
+
+    def test_ambient_deadline_caps_telegram_timeout(self):
+        import homework
+        timeouts = []
+
+        class Bot:
+            def send_message(self, chat_id, text, timeout=None):
+                timeouts.append(timeout)
+
+        with Deadline(0.5):
+            homework.send_to_chat(Bot(), 1, 'Сообщение')
+        homework.send_to_chat(Bot(), 1, 'Сообщение')
+        assert timeouts[0] <= 0.5, (
+            'Отправка внутри цикла должна укладываться в его бюджет.'
+        )
+        assert timeouts[1] == homework.TELEGRAM_TIMEOUT
@@ -0,0 +1,78 @@
+import time
+
+from sharding import HashRing, Shard
+
+
+KEYS = [str(chat_id) for chat_id in range(500)]
+
+
+class TestHashRing:
+
+    def test_removing_member_moves_only_its_keys(self):
+        full = HashRing(['a', 'b', 'c'])
+        reduced = HashRing(['a', 'b'])
+        for key in KEYS:
+            if full.owner(key) != 'c':
+                assert reduced.owner(key) == full.owner(key), (
+                    'При уходе воркера должны переезжать только его ключи.'
+                )
+
+    def test_keys_are_spread_across_members(self):
+        ring = HashRing(['a', 'b', 'c'])
+        owners = [ring.owner(key) for key in KEYS]
+        for member in 'abc':
+            assert owners.count(member) > len(KEYS) / 6
+
+
+class TestShard:
+
+    def make_pair(self, tmp_path):
+        path = str(tmp_path / 'shards.db')
+        first = Shard(path, 'first', ttl=60)
+        second = Shard(path, 'second', ttl=60)
+        for shard in (first, second, first):
+            shard.beat()
+        return first, second
+
+    def test_each_tenant_has_one_owner(self, tmp_path):
+        first, second = self.make_pair(tmp_path)
+        for key in KEYS:
+            assert first.claim(key) != second.claim(key), (
+                'Студента должен опрашивать ровно один воркер.'
+            )
+
+    def test_live_holder_keeps_tenant_until_released(self, tmp_path):
+        first, second = self.make_pair(tmp_path)
+        key = next(key for key in KEYS if first.ring.owner(key) == 'second')
+        second.leave()
+        first.beat()
+        assert first.claim(key)
+        first.done(key)
+        second.beat()
+        assert not second.claim(key), (
+            'Нельзя перехватить студента, пока прежний владелец жив.'
+        )
+        assert first.beat() == [key]
+        assert second.claim(key)
+
+    def test_dead_worker_tenants_are_rebalanced(self, tmp_path):
+        first, second = self.make_pair(tmp_path)
+        claimed = [key for key in KEYS if second.claim(key)]
+        second.connection.execute(
+            'UPDATE workers SET expires = ? WHERE worker_id = ?',
+            (time.time() - 1, 'second')
+        )
+        first.beat()
+        assert all(first.claim(key) for key in claimed)
+
+    def test_released_tenant_leaves_claims(self, tmp_path):
+        first, _ = self.make_pair(tmp_path)
+        key = next(key for key in KEYS if first.claim(key))
+        first.done(key)
+        first.release(key)
+        rows = first.connection.execute(
+            'SELECT COUNT(*) FROM claims WHERE tenant = ?', (key,)
+        ).fetchone()[0]
+        assert rows == 0 and not first.holds(key), (
+            'Удалённый студент не должен оставаться закреплённым.'
+        )
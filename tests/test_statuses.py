@@ -0,0 +1,81 @@
+from statuses import Homework, Status, StatusIndex
+
+
+class TestStatusIndex:
+
+    def test_only_transitions_are_reported(self):
+        index = StatusIndex({'1': ('reviewing', '2022-01-01T10:00:00Z')})
+        homeworks = [
+            Homework('2', 'hw2', Status.REVIEWING, '2022-01-02T10:00:00Z'),
+            Homework('1', 'hw1', Status.REVIEWING, '2022-01-01T10:00:00Z'),
+        ]
+        changed = index.changes(homeworks)
+        assert [hw.key for hw in changed] == ['2'], (
+            'Уведомлять нужно только о работах со сменившимся статусом.'
+        )
+
+    def test_commit_updates_state(self):
+        index = StatusIndex()
+        homework = Homework('1', 'hw1', Status.REVIEWING,
+                            '2022-01-01T10:00:00Z')
+        index.commit(homework)
+        assert index.reviewing
+        assert not index.changes([homework])
+        approved = Homework('1', 'hw1', Status.APPROVED,
+                            '2022-01-02T10:00:00Z')
+        assert index.changes([approved]) == [approved]
+        index.commit(approved)
+        assert not index.reviewing
+
+    def test_stale_update_is_ignored(self):
+        index = StatusIndex({'1': ('approved', '2022-01-02T10:00:00Z')})
+        stale = Homework('1', 'hw1', Status.REVIEWING, '2022-01-01T10:00:00Z')
+        assert not index.changes([stale])
+
+    def test_duplicates_collapse_to_latest_in_date_order(self):
+        index = StatusIndex()
+        homeworks = [
+            Homework('2', 'hw2', Status.APPROVED, '2022-01-03T10:00:00Z'),
+            Homework('1', 'hw1', Status.APPROVED, '2022-01-04T10:00:00Z'),
+            Homework('1', 'hw1', Status.REVIEWING, '2022-01-01T10:00:00Z'),
+        ]
+        changed = index.changes(homeworks)
+        assert [(hw.key, hw.status) for hw in changed] == [
+            ('2', Status.APPROVED), ('1', Status.APPROVED)
+        ]
+
+        index = StatusIndex({'1': ('approved', '2022-01-01T10:00:00Z')})
+        homeworks = [
+            Homework('1', 'hw1', Status.REJECTED, '2022-01-02T10:00:00Z'),
+            Homework('1', 'hw1', Status.APPROVED, '2022-01-03T10:00:00Z'),
+        ]
+        assert not index.changes(homeworks), (
+            'Последний статус работы совпадает с известным: промежуточный '
+            'устаревший статус отправлять нельзя.'
+        )
+
+
+class TestHomework:
+
+    def test_from_json_interns_status(self):
+        first, second = (
+            Homework.from_json({'id': number, 'homework_name': 'hw',
+                                'status': ''.join(['appro', 'ved'])})
+            for number in (1, 2)
+        )
+        assert first.status is second.status is Status.APPROVED
+        assert first.key == '1'
+
+    def test_unknown_status_is_kept(self):
+        homework = Homework.from_json({'homework_name': 'hw', 'status': 'x'})
+        assert homework.status == 'x' and homework.key == 'hw'
+
+    def test_record_has_no_instance_dict(self):
+        homework = Homework('1', 'hw', Status.APPROVED)
+        assert not hasattr(homework, '__dict__')
+
+    def test_null_id_falls_back_to_name(self):
+        homework = Homework.from_json(
+            {'id': None, 'homework_name': 'hw', 'status': 'approved'}
+        )
+        assert homework.key == 'hw'
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import exceptions
+from statuses import Homework
+from streaming import StreamedResponse
+
+
+def chunked(data, size=7):
+    body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestStreamedResponse:
+
+    def test_homeworks_are_yielded_one_by_one(self):
+        data = {
+            'homeworks': [
+                {'id': number, 'homework_name': f'Работа {number}',
+                 'status': 'approved'}
+                for number in range(50)
+            ],
+            'current_date': 1000198991
+        }
+        response = StreamedResponse(chunked(data))
+        assert list(response.homeworks()) == [
+            Homework.from_json(item) for item in data['homeworks']
+        ]
+        assert response.current_date == 1000198991
+
+    def test_current_date_before_homeworks(self):
+        body = b'{"current_date": 123246, "homeworks": []}'
+        response = StreamedResponse([body[:17], body[17:]])
+        assert list(response.homeworks()) == []
+        assert response.current_date == 123246
+
+    @pytest.mark.parametrize('data, error', (
+        ({'current_date': 123246}, KeyError),
+        ([{'homeworks': []}], TypeError),
+        ({'homeworks': {'homework_name': 'hw123'}}, TypeError),
+    ))
+    def test_invalid_structure(self, data, error):
+        response = StreamedResponse(chunked(data))
+        with pytest.raises(error):
+            list(response.homeworks())
+
+    def test_truncated_body(self):
+        response = StreamedResponse(
+            [b'{"homeworks": [{"homework_name": "hw", "status": "approved"}']
+        )
+        with pytest.raises(exceptions.FormatError):
+            list(response.homeworks())
+
+    @pytest.mark.parametrize('body', (
+        b'{"homeworks": [{"homework_name": "hw", "status": "approved"}',
+        b'[{"homeworks": []}]',
+        b'{"homeworks": [], "current_date": 1}',
+    ))
+    def test_response_is_closed(self, body):
+        class Response:
+            closed = False
+
+            def close(self):
+                self.closed = True
+
+        http_response = Response()
+        response = StreamedResponse([body], response=http_response)
+        try:
+            list(response.homeworks())
+        except (exceptions.FormatError, TypeError):
+            pass
+        assert http_response.closed, (
+            'Соединение должно возвращаться в пул и при ошибке разбора.'
+        )
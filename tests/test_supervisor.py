@@ -0,0 +1,47 @@
+import sys
+import time
+
+from supervisor import Supervisor
+
+
+SLEEPER = (sys.executable, '-c', 'import time; time.sleep(30)')
+CRASHER = (sys.executable, '-c', 'raise SystemExit(3)')
+
+
+class TestSupervisor:
+
+    def test_children_get_own_worker_id_and_shared_shard_db(self):
+        supervisor = Supervisor(processes=2, command=SLEEPER)
+        first, second = (
+            supervisor.child_env(child) for child in supervisor.children
+        )
+        assert first['SHARD_WORKER_ID'] != second['SHARD_WORKER_ID']
+        assert first['SHARD_DB'] == second['SHARD_DB']
+        assert first['LOG_FILE'] != second['LOG_FILE']
+
+    def test_crashed_child_is_restarted_with_backoff(self):
+        supervisor = Supervisor(processes=1, command=CRASHER)
+        child = supervisor.children[0]
+        supervisor.check()
+        child.process.wait()
+        now = time.time()
+        supervisor.check(now)
+        assert child.process is None and child.restarts == 1
+        assert child.start_at > now
+        supervisor.check(child.start_at)
+        assert child.process is not None
+        child.process.wait()
+
+    def test_hung_child_is_killed_and_drain_stops_the_rest(self):
+        supervisor = Supervisor(
+            processes=2, command=SLEEPER, heartbeat_timeout=10,
+            drain_timeout=5
+        )
+        supervisor.check()
+        hung, healthy = supervisor.children
+        hung.started -= 60
+        supervisor.check()
+        assert hung.process is None and hung.restarts == 1
+        process = healthy.process
+        supervisor.drain()
+        assert process.poll() is not None
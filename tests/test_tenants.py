@@ -0,0 +1,40 @@
+import json
+import os
+
+from tenants import TenantRegistry
+
+
+def write(path, entries, mtime):
+    path.write_text(json.dumps(entries), encoding='utf-8')
+    os.utime(path, ns=(mtime, mtime))
+
+
+class TestTenantRegistry:
+
+    def test_changes_are_applied_incrementally(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write(path, [{'practicum_token': 'a', 'chat_id': 1},
+                     {'practicum_token': 'b', 'chat_id': 2}], 1)
+        registry = TenantRegistry(str(path))
+        first, second = registry.load()
+        assert registry.poll() == ([], [])
+
+        write(path, [{'practicum_token': 'a2', 'chat_id': 1},
+                     {'practicum_token': 'c', 'chat_id': 3},
+                     {'chat_id': 4}], 2)
+        added, removed = registry.poll()
+        assert [tenant.key for tenant in added] == ['3']
+        assert removed == [second]
+        assert registry.tenants['1'] is first, (
+            'Оставшиеся студенты не должны пересоздаваться.'
+        )
+        assert first.headers == {'Authorization': 'OAuth a2'}
+
+    def test_broken_file_keeps_current_list(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        write(path, [{'practicum_token': 'a', 'chat_id': 1}], 1)
+        registry = TenantRegistry(str(path))
+        registry.load()
+        path.write_text('[{"practicum_token": ', encoding='utf-8')
+        assert registry.poll() == ([], [])
+        assert list(registry.tenants) == ['1']
@@ -0,0 +1,90 @@
+import pytest
+import requests
+
+import exceptions
+import homework
+import transport
+from scheduler import Deadline
+
+
+class TestTransport:
+
+    def test_default_transport_is_requests(self):
+        transport.configure(pool_size=0)
+        assert transport.get_session() is requests
+
+    def test_pool_is_enabled_by_default(self):
+        try:
+            assert transport.configure() is not None, (
+                'По умолчанию запросы должны идти через пул соединений.'
+            )
+        finally:
+            transport.configure(pool_size=0)
+
+    def test_configured_session_is_pooled(self):
+        session = transport.configure(pool_size=8, retries=2)
+        try:
+            assert transport.get_session() is session
+            adapter = session.get_adapter('https://practicum.yandex.ru')
+            assert adapter._pool_maxsize == 8
+            assert transport.get_retries() == 2
+        finally:
+            transport.configure(pool_size=0)
+
+    def test_retries_stop_at_deadline(self, monkeypatch):
+        timeouts = []
+
+        class HangingSession:
+            def get(self, *args, timeout=None, **kwargs):
+                timeouts.append(timeout)
+                raise requests.ConnectTimeout('Something wrong')
+
+        monkeypatch.setattr(transport, '_session', HangingSession())
+        monkeypatch.setattr(transport, '_retries', 3)
+        with pytest.raises(exceptions.PracticumAPIError):
+            with Deadline(0.3):
+                homework.get_api_answer(0)
+        assert len(timeouts) == 1 and max(timeouts[0]) <= 0.3, (
+            'Повторы запроса не должны выходить за бюджет цикла.'
+        )
+
+    def test_retries_on_bad_gateway(self, monkeypatch):
+        statuses = [502, 200]
+
+        class Response:
+            def __init__(self, status_code):
+                self.status_code = status_code
+
+            def json(self):
+                return {'homeworks': [], 'current_date': 1}
+
+        class FlakySession:
+            def get(self, *args, **kwargs):
+                return Response(statuses.pop(0))
+
+        monkeypatch.setattr(transport, '_session', FlakySession())
+        monkeypatch.setattr(transport, '_retries', 1)
+        monkeypatch.setattr(transport, 'backoff', lambda *args: True)
+        assert homework.get_api_answer(0)['current_date'] == 1
+        assert not statuses
+
+    def test_response_cache_skips_unchanged_body(self):
+        class Response:
+            status_code = 200
+            headers = {}
+
+            def __init__(self, body):
+                self.content = body
+
+        cache = transport.ResponseCache()
+        first = Response(b'{"homeworks": [], "current_date": 100}')
+        assert cache.unchanged_date(first) is None
+        cache.commit()
+        second = Response(b'{"homeworks": [], "current_date": 200}')
+        assert cache.unchanged_date(second) == 200, (
+            'Ответ, отличающийся только current_date, считается неизменным.'
+        )
+        changed = Response(
+            b'{"homeworks": [{"id": 1}], "current_date": 300}'
+        )
+        assert cache.unchanged_date(changed) is None
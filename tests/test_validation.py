@@ -0,0 +1,44 @@
+import exceptions
+from statuses import Status
+from validation import HomeworkValidator
+
+
+class TestHomeworkValidator:
+
+    def test_bad_records_do_not_drop_the_batch(self):
+        homeworks = [
+            {'id': 1, 'homework_name': 'hw1', 'status': 'approved'},
+            'не словарь',
+            {'id': 3, 'status': 'approved'},
+            {'id': 4, 'homework_name': 'hw4', 'status': 'lost'},
+            {'id': '5', 'homework_name': 'hw5', 'status': 'reviewing'},
+            {'id': 6, 'homework_name': 'hw6', 'status': 'rejected',
+             'date_updated': '2022-01-01T10:00:00Z'},
+        ]
+        result = HomeworkValidator().validate(homeworks)
+        assert [hw.key for hw in result.records] == ['1', '6']
+        assert result.records[1].status is Status.REJECTED
+        assert [
+            (type(error), error.index, error.field) for error in result.errors
+        ] == [
+            (exceptions.DataTypeError, 1, None),
+            (exceptions.KeyNotFound, 2, 'homework_name'),
+            (exceptions.FormatError, 3, 'status'),
+            (exceptions.DataTypeError, 4, 'id'),
+        ]
+
+    def test_missing_optional_fields_are_allowed(self):
+        result = HomeworkValidator().validate(
+            [{'homework_name': 'hw', 'status': 'reviewing'}]
+        )
+        assert not result.errors
+        assert result.records[0].key == 'hw'
+
+    def test_null_id_falls_back_to_name(self):
+        result = HomeworkValidator().validate([
+            {'id': None, 'homework_name': 'hw1', 'status': 'approved'},
+            {'id': None, 'homework_name': 'hw2', 'status': 'rejected'},
+        ])
+        assert [record.key for record in result.records] == ['hw1', 'hw2'], (
+            'Работы без id не должны схлопываться в одну запись.'
+        )
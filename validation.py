@@ -0,0 +1,114 @@
+import logging
+
+import exceptions
+import metrics
+from statuses import Homework, Status
+
+
+logger = logging.getLogger(__name__)
+
+HOMEWORK_SCHEMA = {
+    'homework_name': (str, True),
+    'status': (str, True),
+    'id': (int, False),
+    'date_updated': (str, False),
+}
+
+INVALID_RECORDS = metrics.Counter(
+    'homework_invalid_records_total',
+    'Отброшенные записи ответа API', ('exception',)
+)
+
+
+class Result:
+    """Итог проверки: корректные записи и ошибки по остальным."""
+
+    __slots__ = ('records', 'errors')
+
+    def __init__(self, records, errors):
+        self.records = records
+        self.errors = errors
+
+
+class HomeworkValidator:
+    """Проверяет домашние работы из ответа API за один проход.
+
+    Схема разбирается один раз при создании. Некорректная запись не
+    прерывает проверку: она попадает в список ошибок, а остальные
+    превращаются в Homework.
+    """
+
+    def __init__(self, schema=HOMEWORK_SCHEMA, statuses=Status):
+        self.required = tuple(
+            (field, kind) for field, (kind, required) in schema.items()
+            if required
+        )
+        self.optional = tuple(
+            (field, kind) for field, (kind, required) in schema.items()
+            if not required
+        )
+        self.statuses = frozenset(status.value for status in statuses)
+
+    def check(self, index, data):
+        """Возвращает Homework или выбрасывает RecordError."""
+        if not isinstance(data, dict):
+            raise exceptions.DataTypeError(
+                f"Работа {index}: не является словарем", index
+            )
+        for field, kind in self.required:
+            if field not in data:
+                raise exceptions.KeyNotFound(
+                    f"Работа {index}: нет ключа {field}", index, field
+                )
+            if not isinstance(data[field], kind):
+                raise exceptions.DataTypeError(
+                    f"Работа {index}: {field} не {kind.__name__}",
+                    index, field
+                )
+        for field, kind in self.optional:
+            value = data.get(field)
+            if value is not None and not isinstance(value, kind):
+                raise exceptions.DataTypeError(
+                    f"Работа {index}: {field} не {kind.__name__}",
+                    index, field
+                )
+        if data['status'] not in self.statuses:
+            raise exceptions.FormatError(
+                f"Работа {index}: неизвестный статус {data['status']}",
+                index, 'status'
+            )
+        name = data['homework_name']
+        key = data.get('id')
+        return Homework(
+            str(name if key is None else key), name, Status(data['status']),
+            data.get('date_updated')
+        )
+
+    def iter_valid(self, homeworks, errors):
+        """Отдаёт корректные записи, ошибки складывает в errors."""
+        for index, data in enumerate(homeworks):
+            try:
+                yield self.check(index, data)
+            except exceptions.RecordError as error:
+                INVALID_RECORDS.labels(type(error).__name__).inc()
+                logger.error("Запись ответа API отброшена: %s", error)
+                errors.append(error)
+
+    def validate(self, homeworks):
+        """Проверяет весь список и возвращает Result."""
+        errors = []
+        records = list(self.iter_valid(homeworks, errors))
+        return Result(records, errors)
+
+
+def describe(errors):
+    """Возвращает текст уведомления об отброшенных записях или None."""
+    if not errors:
+        return None
+    return (
+        f'Сбой в работе программы: отброшено записей ответа API: '
+        f'{len(errors)}, первая — {errors[0]}'
+    )
+
+
+VALIDATOR = HomeworkValidator()